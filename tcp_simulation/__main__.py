@@ -0,0 +1,7 @@
+# __main__.py
+# Lets the directory run directly: python tcp_simulation run ...
+
+import sys
+from cli import main
+
+sys.exit(main())
@@ -2,10 +2,9 @@
 # Manages the network packet animations
 
 import random
-import threading
 import time
 import queue
-from constants import PACKET_COLORS
+from constants import DATA, PACKET_COLORS, LINK_TRANSIT_TIME, FRAME_INTERVAL, MAX_STEPS_PER_FRAME
 from connection_manager import ConnectionManager
 
 class AnimationManager:
@@ -16,7 +15,20 @@ class AnimationManager:
         self.packet_queue = queue.Queue()
         self.active_animations = []
         self.stop_flag = False
-        
+
+        # Simulated clock: advanced in fixed steps of FRAME_INTERVAL * speed
+        self.sim_time = 0.0
+        self.accumulator = 0.0
+        self.last_frame = None
+        self.next_deadline = None
+
+        # Frame telemetry, reported to the network UI about once a second
+        self.frames = 0
+        self.overruns = 0
+        self.skipped_frames = 0
+        self.fps = 0.0
+        self.telemetry_start = None
+
         # Initialize canvas safely through event manager
         self._initialize_canvas()
 
@@ -27,29 +39,99 @@ class AnimationManager:
             self.active_animations = []
         self.event_manager.queue_event(_clear)
 
-    def start_animation_thread(self):
-        """Start the animation processing thread"""
-        self.animation_thread = threading.Thread(target=self.animation_loop)
-        self.animation_thread.daemon = True
-        self.animation_thread.start()
+    def start(self):
+        """Start the frame scheduler on the Tk event loop (main thread)"""
+        self.last_frame = self.telemetry_start = time.perf_counter()
+        self.next_deadline = self.last_frame + FRAME_INTERVAL
+        self.canvas.after(int(FRAME_INTERVAL * 1000), self.frame)
 
-    def animation_loop(self):
-        """Main animation loop - processes queued packets and updates animations"""
-        while not self.stop_flag and not self.event_manager.stop_flag:
-            try:
-                if not self.packet_queue.empty() and not self.event_manager.paused:
-                    direction, packet = self.packet_queue.get_nowait()
-                    self.animate_packet(direction, packet)
-                    self.event_manager.packet_sent.set()
-                
-                if not self.event_manager.paused:
+    def frame(self):
+        """One frame: advance the simulated clock by real elapsed time in fixed
+        steps, then draw once. When behind, steps run without drawing; lag past
+        MAX_STEPS_PER_FRAME is dropped instead of replayed. Fast-forward scales
+        the steps and skips drawing altogether."""
+        frame_start = time.perf_counter()
+        elapsed = frame_start - self.last_frame
+        self.last_frame = frame_start
+
+        fast_forward = self.event_manager.fast_forward
+        try:
+            if self.event_manager.paused or self.stop_flag:
+                self.accumulator = 0.0
+            elif fast_forward:
+                # Nothing is drawn, so the clock follows real time (or, to run
+                # to the end, jumps to the last arrival) and frames come back
+                # as soon as Tk is idle: deliveries never wait for a frame tick
+                self.start_queued_packets()
+                if fast_forward == float("inf"):
+                    if self.active_animations:
+                        self.sim_time = max(anim["arrives_at"] for anim in self.active_animations)
+                else:
+                    self.sim_time += min(elapsed, MAX_STEPS_PER_FRAME * FRAME_INTERVAL) * fast_forward
+                self.update_animations()
+                self.event_manager.metrics.in_flight.record(
+                    self.sim_time, len(self.active_animations) + self.packet_queue.qsize())
+            else:
+                self.start_queued_packets()
+                self.accumulator += elapsed
+                steps = int(self.accumulator / FRAME_INTERVAL)
+                self.accumulator -= steps * FRAME_INTERVAL
+                if steps > MAX_STEPS_PER_FRAME:
+                    self.skipped_frames += steps - MAX_STEPS_PER_FRAME
+                    steps = MAX_STEPS_PER_FRAME
+                if steps > 1:
+                    self.skipped_frames += steps - 1
+
+                step = FRAME_INTERVAL * self.network_ui.get_simulation_speed()
+                for _ in range(steps):
+                    self.sim_time += step
                     self.update_animations()
-                
-                time.sleep(0.05)
+                if steps:
+                    self.draw_animations()
+                self.event_manager.metrics.in_flight.record(
+                    self.sim_time, len(self.active_animations) + self.packet_queue.qsize())
+        except Exception as e:
+            print(f"Animation frame error: {e}")
+
+        now = time.perf_counter()
+        if fast_forward:
+            self.record_frame(frame_start)
+            self.next_deadline = now + FRAME_INTERVAL
+            self.canvas.after(1, self.frame)
+            return
+
+        # Overrun: this frame's work, or whatever else held up the Tk loop,
+        # blew through its budget
+        if now - frame_start > FRAME_INTERVAL or frame_start - self.next_deadline > FRAME_INTERVAL:
+            self.overruns += 1
+        self.record_frame(frame_start)
+
+        # Schedule against fixed deadlines so timer rounding does not drift;
+        # after a stall, restart from now instead of firing a burst of frames
+        self.next_deadline += FRAME_INTERVAL
+        if self.next_deadline < now:
+            self.next_deadline = now + FRAME_INTERVAL
+        self.canvas.after(max(1, round((self.next_deadline - now) * 1000)), self.frame)
+
+    def record_frame(self, now):
+        """Count a frame and publish FPS, overruns and skipped frames every second"""
+        self.frames += 1
+        window = now - self.telemetry_start
+        if window >= 1.0:
+            self.fps = self.frames / window
+            self.frames = 0
+            self.telemetry_start = now
+            self.network_ui.show_frame_stats(self.fps, self.overruns, self.skipped_frames, self.sim_time)
+
+    def start_queued_packets(self):
+        """Begin animating every packet queued by the protocol threads"""
+        while True:
+            try:
+                direction, packet = self.packet_queue.get_nowait()
             except queue.Empty:
-                pass
-            except Exception as e:
-                print(f"Animation loop error: {e}")
+                return
+            self._animate_packet(direction, packet)
+            self.event_manager.packet_sent.set()
 
     def animate_packet(self, direction, packet):
         """Start a new packet animation"""
@@ -60,99 +142,103 @@ class AnimationManager:
         try:
             canvas_width = self.canvas.winfo_width() or 200
             canvas_height = self.canvas.winfo_height() or 400
-            
+
             start_x = 20 if direction == "client_to_server" else canvas_width - 20
             end_x = canvas_width - 20 if direction == "client_to_server" else 20
             y_pos = random.randint(30, canvas_height - 30)
-            
-            color = PACKET_COLORS.get(packet.packet_type, "black")
-            fill_color = "white" if packet.is_corrupt else color
-            
-            packet_obj = self.canvas.create_oval(
-                start_x - 15, y_pos - 15,
-                start_x + 15, y_pos + 15,
-                outline=color, fill=fill_color, width=2
-            )
-            
-            text = f"{packet.packet_type}\n{packet.seq_num}" if packet.seq_num else packet.packet_type
-            text_obj = self.canvas.create_text(start_x, y_pos, text=text, font=("Arial", 8))
-            
-            with self.event_manager.lock:
-                self.active_animations.append({
-                    "packet_obj": packet_obj,
-                    "text_obj": text_obj,
-                    "start_x": start_x,
-                    "end_x": end_x,
-                    "y_pos": y_pos,
-                    "progress": 0.0,
-                    "speed": 0.02,
-                    "direction": direction,
-                    "packet": packet
-                })
+
+            anim = {
+                "packet_obj": None,
+                "text_obj": None,
+                "start_x": start_x,
+                "end_x": end_x,
+                "y_pos": y_pos,
+                "sent_at": self.sim_time,
+                "arrives_at": self.sim_time + LINK_TRANSIT_TIME,
+                "direction": direction,
+                "packet": packet
+            }
+            if not self.event_manager.fast_forward:
+                self._create_packet_visuals(anim)
+            self.active_animations.append(anim)
         except Exception as e:
             print(f"Packet animation failed: {e}")
 
+    def _create_packet_visuals(self, anim):
+        """Create the canvas items of an animation at its start position"""
+        packet = anim["packet"]
+        x, y_pos = anim["start_x"], anim["y_pos"]
+        color = PACKET_COLORS.get(packet.packet_type, "black")
+        fill_color = "white" if packet.is_corrupt else color
+
+        anim["packet_obj"] = self.canvas.create_oval(
+            x - 15, y_pos - 15,
+            x + 15, y_pos + 15,
+            outline=color, fill=fill_color, width=2
+        )
+        text = f"{packet.packet_type}\n{packet.seq_num}" if packet.seq_num else packet.packet_type
+        anim["text_obj"] = self.canvas.create_text(x, y_pos, text=text, font=("Arial", 8))
+
+    def set_fast_forward(self, active):
+        """Drop the canvas items on entering fast-forward; rebuild them from the
+        packets still in flight on leaving it - runs in main thread"""
+        self.canvas.delete("all")
+        for anim in self.active_animations:
+            anim["packet_obj"] = anim["text_obj"] = None
+            if not active:
+                self._create_packet_visuals(anim)
+        if not active:
+            self.draw_animations()
+
     def update_animations(self):
-        """Update positions of all active packet animations"""
+        """Deliver every packet whose arrival time the simulated clock has reached"""
         if not self.active_animations:
             return
-            
-        completed = []
-        speed_factor = self.network_ui.get_simulation_speed()
-        
-        for i, anim in enumerate(self.active_animations):
-            anim["progress"] += anim["speed"] * speed_factor
-            
-            if anim["progress"] >= 1.0:
-                completed.append(i)
-                self.event_manager.packet_received.set()
-                continue
-                
-            new_x = anim["start_x"] + anim["progress"] * (anim["end_x"] - anim["start_x"])
-            self.event_manager.queue_event(lambda i=i, new_x=new_x: self._update_animation_position(i, new_x))
-            
-        for i in sorted(completed, reverse=True):
-            self.event_manager.queue_event(lambda i=i: self._remove_animation(i))
-
-    def _update_animation_position(self, i, new_x):
-        """Update the position of an animation object - runs in main thread"""
-        try:
-            if i >= len(self.active_animations):
-                return
-                
-            anim = self.active_animations[i]
+
+        in_flight = []
+        for anim in self.active_animations:
+            if self.sim_time >= anim["arrives_at"]:
+                self._remove_animation(anim)
+            else:
+                in_flight.append(anim)
+        self.active_animations = in_flight
+
+    def draw_animations(self):
+        """Move every packet to where the simulated clock puts it"""
+        for anim in self.active_animations:
+            progress = (self.sim_time - anim["sent_at"]) / (anim["arrives_at"] - anim["sent_at"])
+            new_x = anim["start_x"] + progress * (anim["end_x"] - anim["start_x"])
             self.canvas.coords(
                 anim["packet_obj"],
                 new_x - 15, anim["y_pos"] - 15,
                 new_x + 15, anim["y_pos"] + 15
             )
             self.canvas.coords(anim["text_obj"], new_x, anim["y_pos"])
-        except Exception as e:
-            print(f"Error updating animation: {e}")
 
-    def _remove_animation(self, i):
+    def _remove_animation(self, anim):
         """Remove a completed animation - runs in main thread"""
         try:
-            if i >= len(self.active_animations):
-                return
-                
-            anim = self.active_animations.pop(i)
-            self.canvas.delete(anim["packet_obj"])
-            self.canvas.delete(anim["text_obj"])
-            
+            if anim["packet_obj"] is not None:
+                self.canvas.delete(anim["packet_obj"])
+                self.canvas.delete(anim["text_obj"])
+
             packet = anim["packet"]
-            if (anim["direction"] == "server_to_client" and 
-                hasattr(packet, "seq_num") and 
+            if (anim["direction"] == "server_to_client" and
+                hasattr(packet, "seq_num") and
                 packet.seq_num is not None):
                 with self.event_manager.packet_processing_lock:
                     ConnectionManager.received_packets[packet.seq_num] = packet
-            
+                if packet.packet_type == DATA and not packet.is_corrupt:
+                    self.event_manager.metrics.goodput.add(self.sim_time)
+
             self.event_manager.packet_received.set()
         except Exception as e:
             print(f"Error removing animation: {e}")
 
     def queue_packet(self, direction, packet):
         """Queue a packet for animation"""
+        if self.event_manager.packet_listeners:
+            self.event_manager.notify_packet(direction, packet, self.sim_time)
         self.packet_queue.put((direction, packet))
         self.event_manager.packet_sent.clear()
         self.event_manager.packet_received.clear()
@@ -160,20 +246,20 @@ class AnimationManager:
     def stop_animations(self):
         """Stop all animations and clear the canvas"""
         self.stop_flag = True
-        
+
         # Clear packet queue
         while not self.packet_queue.empty():
             try:
                 self.packet_queue.get_nowait()
             except queue.Empty:
                 break
-        
+
         # Clear canvas and animations
         def _clear_all():
             self.canvas.delete("all")
             self.active_animations = []
         self.event_manager.queue_event(_clear_all)
-        
+
         self.stop_flag = False
         print("Animations stopped and canvas cleared")
 
@@ -182,4 +268,4 @@ class AnimationManager:
         self.event_manager.queue_event(lambda: [
             self.canvas.delete("all"),
             setattr(self, 'active_animations', [])
-        ])
\ No newline at end of file
+        ])
@@ -0,0 +1,160 @@
+# byte_stream.py
+# Real byte streams for transfers: zero-copy segmentation and preallocated reassembly
+
+import hashlib
+import mmap
+import os
+import tempfile
+from constants import DEFAULT_MSS
+
+# Sinks without an output path larger than this live in a temporary file
+IN_MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+def _map_file(path, writable=False, size=None):
+    """Memory-map a file; returns (file, mapping) or (None, b"") for empty files"""
+    if writable:
+        f = open(path, "w+b")
+        f.truncate(size)
+    else:
+        f = open(path, "rb")
+        size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        f.close()
+        return None, b""
+    access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+    return f, mmap.mmap(f.fileno(), size, access=access)
+
+
+def _map_temporary(size):
+    """Memory-map an anonymous temporary file of size bytes (deleted once closed)"""
+    f = tempfile.TemporaryFile()
+    f.truncate(size)
+    return f, mmap.mmap(f.fileno(), size)
+
+
+class ByteStreamSource:
+    def __init__(self, path=None, data=None, mss=DEFAULT_MSS):
+        """Server side: a file (or in-memory bytes) cut into MSS-sized segments.
+
+        Segments are memoryview slices of one memory-mapped buffer, so sending
+        a segment never copies it.
+        """
+        self.path = path
+        self.mss = mss
+        self._file = None
+        if path is not None:
+            self._file, buffer = _map_file(path)
+        else:
+            buffer = data if data is not None else b""
+        self._buffer = buffer
+        self.view = memoryview(buffer)
+        self.size = len(self.view)
+        self.num_segments = (self.size + mss - 1) // mss
+        self._digest = None
+
+    def segment(self, seq):
+        """Payload of DATA packet seq (1-based) as a view into the source"""
+        start = (seq - 1) * self.mss
+        return self.view[start:start + self.mss]
+
+    def digest(self):
+        """SHA-256 of the whole stream (computed once, streaming over the mapping)"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.view).hexdigest()
+        return self._digest
+
+    def close(self):
+        self.view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass  # Segments still held by packets; unmapped once they are dropped
+        if self._file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        # Checkpoints store where the bytes come from, not the bytes themselves
+        state = {"path": self.path, "mss": self.mss, "digest": self._digest}
+        if self.path is None:
+            state["data"] = bytes(self.view)
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state.get("data"), state["mss"])
+        self._digest = state["digest"]
+
+
+class ReassemblyBuffer:
+    def __init__(self, size, mss=DEFAULT_MSS, path=None):
+        """Client side: preallocated destination for a stream of known size.
+
+        With a path the buffer is a memory-mapped output file, so memory use
+        stays bounded however large the transfer is. Without one, streams over
+        IN_MEMORY_LIMIT bytes are mapped from a temporary file for the same reason.
+        """
+        self.size = size
+        self.mss = mss
+        self.path = path
+        self._file = None
+        if path is not None:
+            self._file, buffer = _map_file(path, writable=True, size=size)
+        elif size > IN_MEMORY_LIMIT:
+            self._file, buffer = _map_temporary(size)
+        else:
+            buffer = bytearray(size)
+        self._buffer = buffer
+        self.view = memoryview(buffer)
+        self.bytes_written = 0
+
+    def write(self, seq, payload):
+        """Place the payload of DATA packet seq at its offset"""
+        start = (seq - 1) * self.mss
+        length = len(payload)
+        self.view[start:start + length] = payload
+        self.bytes_written += length
+
+    def digest(self):
+        return hashlib.sha256(self.view).hexdigest()
+
+    def close(self):
+        self.view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.flush()
+            self._buffer.close()
+        if self._file:
+            self._file.close()
+
+    def __getstate__(self):
+        state = {"size": self.size, "mss": self.mss, "path": self.path,
+                 "bytes_written": self.bytes_written}
+        if self._file and self.path is None:
+            # Copying a stream this large into the checkpoint would load all of it
+            raise ValueError(f"Cannot checkpoint a {self.size}-byte transfer without an output "
+                             f"path (streams over {IN_MEMORY_LIMIT} bytes need one)")
+        if self.path is None:
+            state["data"] = self._buffer
+        else:
+            self._buffer.flush()
+        return state
+
+    def __setstate__(self, state):
+        self.size = state["size"]
+        self.mss = state["mss"]
+        self.path = state["path"]
+        self.bytes_written = state["bytes_written"]
+        self._file = None
+        if self.path is None:
+            self._buffer = state["data"]
+        else:
+            # Reopen the existing output file without truncating what was written
+            self._file = open(self.path, "r+b")
+            self._buffer = mmap.mmap(self._file.fileno(), self.size) if self.size else b""
+        self.view = memoryview(self._buffer)
@@ -0,0 +1,76 @@
+# chart_ui.py
+# Live time-series charts of the running simulation
+
+import tkinter as tk
+
+REFRESH_MS = 500  # Charts redraw at most twice a second
+COLORS = ("#2a7", "#37c", "#d43", "#c80")
+
+
+class ChartUI:
+    def __init__(self, parent_frame, event_manager):
+        self.frame = tk.LabelFrame(parent_frame, text="Charts", padx=5, pady=5, width=260)
+        self.frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.event_manager = event_manager
+        self.metrics = event_manager.metrics
+
+        self.canvas = tk.Canvas(self.frame, width=260, height=400, bg="white")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+    def start(self):
+        """Start the periodic redraw on the Tk event loop"""
+        self.canvas.after(REFRESH_MS, self.refresh)
+
+    def refresh(self):
+        try:
+            self.draw()
+        except Exception as e:
+            print(f"Chart drawing failed: {e}")
+        self.canvas.after(REFRESH_MS, self.refresh)
+
+    def draw(self):
+        """Redraw every chart; each series is cut down to one point per pixel column"""
+        width = self.canvas.winfo_width() or 260
+        height = self.canvas.winfo_height() or 400
+        charts = self.metrics.charts()
+        panel_height = height / len(charts)
+        left, right = 6, width - 6
+        columns = max(1, int(right - left))
+
+        starts = [s.start_time for _, s in charts if s.count]
+        ends = [s.end_time for _, s in charts if s.count]
+        t0 = min(starts) if starts else 0.0
+        t1 = max(ends) if ends else 1.0
+        t_scale = (right - left) / max(t1 - t0, 1e-9)
+
+        self.canvas.delete("all")
+        for i, ((title, series), color) in enumerate(zip(charts, COLORS)):
+            top = i * panel_height + 16
+            bottom = (i + 1) * panel_height - 4
+            last = series.last()
+            label = f"{title}: {last:.1f}" if last is not None else title
+            self.canvas.create_text(left, top - 9, text=label, anchor=tk.W, font=("Arial", 8))
+            self.canvas.create_line(left, bottom, right, bottom, fill="#bbb")
+
+            points = series.downsample(columns)
+            if not points:
+                continue
+            peak = max(high for _, _, high in points) or 1.0
+            v_scale = (bottom - top) / peak
+            self.canvas.create_text(right, top - 9, text=f"max {peak:g}", anchor=tk.E,
+                                    font=("Arial", 7), fill="#888")
+
+            # Min/max envelope: along the maxima, then back along the minima
+            upper = []
+            lower = []
+            for t, low, high in points:
+                x = left + (t - t0) * t_scale
+                upper.extend((x, bottom - high * v_scale))
+                lower.extend((x, bottom - low * v_scale))
+            if len(points) == 1:
+                x, y = upper
+                self.canvas.create_line(x, y, x, lower[1], x + 1, y, fill=color)
+                continue
+            envelope = upper + [c for j in range(len(lower) - 2, -1, -2) for c in lower[j:j + 2]]
+            self.canvas.create_polygon(envelope, fill=color, outline=color, stipple="gray50")
+            self.canvas.create_line(upper, fill=color)
@@ -0,0 +1,34 @@
+# checkpoint.py
+# Saves and restores the complete state of a headless Simulator
+
+import os
+import pickle
+import zlib
+
+MAGIC = b"TCPSIM"
+FORMAT_VERSION = 1
+
+
+def save_checkpoint(sim, path):
+    """Write a compressed snapshot of sim (connections, in-flight packets,
+    pending timers, RNG state and stats) to path, replacing it atomically"""
+    payload = zlib.compress(pickle.dumps(sim, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(bytes((FORMAT_VERSION,)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return len(payload) + len(MAGIC) + 1
+
+
+def load_checkpoint(path):
+    """Restore a Simulator saved by save_checkpoint; run() continues where it stopped"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a simulation checkpoint")
+    version = data[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version} (expected {FORMAT_VERSION})")
+    return pickle.loads(zlib.decompress(data[len(MAGIC) + 1:]))
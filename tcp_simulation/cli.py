@@ -0,0 +1,479 @@
+# cli.py
+# Command-line entry point: headless scenario runs, with the GUI loaded only on request
+#
+# Usage (from this directory):
+#   python -m cli run --connections 100 --packets 20 --window 5
+#   python -m cli run --connections 10000 --workers 4
+#   python -m cli run --connections 1000 --until 60 --checkpoint run.ckpt
+#   python -m cli run --connections 50 --packets 100 --window 8 --compare-ack
+#   python -m cli run --packets 200 --window 8 --loss-rate 5 --svg diagrams
+#   python -m cli ladder diagrams --error-rate 0 10 30 --loss-rate 0 5
+#   python -m cli run --connections 40 --packets 50 --window 8 --topology dumbbell:4 --link-rate 400 --queue-limit 64
+#   python -m cli balance --connections 500 --server-rates 400 200 200 100
+#   python -m cli resume run.ckpt
+#   python -m cli transfer big.iso --output copy.iso --window 256 --pcap transfer.pcap
+#   python -m cli run --connections 1000 --packets 100 --pcap run.pcap
+#   python -m cli run --connections 5000 --packets 50 --stream /tmp/sim.sock --stream-wait 10
+#   python -m cli watch /tmp/sim.sock
+#   python -m cli bench-socket --packets 100000 --window 64
+#   python -m cli gui
+
+import argparse
+import itertools
+import sys
+import time
+
+
+def topology_spec(spec):
+    """argparse type for --topology: reject a malformed spec at parse time"""
+    from topology import parse_topology
+    try:
+        parse_topology(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return spec
+
+
+def add_scenario_arguments(parser):
+    parser.add_argument("--connections", type=int, default=1, help="number of simulated connections")
+    parser.add_argument("--packets", type=int, default=5, help="packets requested per connection")
+    parser.add_argument("--window", type=int, default=3, help="receive window size (packets)")
+    parser.add_argument("--error-rate", type=float, default=10.0, help="packet corruption rate (%%)")
+    parser.add_argument("--loss-rate", type=float, default=0.0, help="packet loss rate (%%)")
+    parser.add_argument("--link-delay", type=float, default=0.05,
+                        help="one-way link delay (s); with --topology, the delay of every link")
+    parser.add_argument("--read-rate", type=float, default=None,
+                        help="packets/s the receiving application reads (default: instantly)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    parser.add_argument("--ack-mode", choices=("nack", "sack"), default="nack",
+                        help="per-window NACK/ACK, or cumulative ACKs with SACK ranges")
+    parser.add_argument("--ack-every", type=int, default=0,
+                        help="sack mode: also ACK every N segments (0: window end, damage and timer only)")
+    parser.add_argument("--delayed-ack", type=float, default=0.1,
+                        help="delayed-ACK timer (s); also caps how long an ACK waits for the reader")
+    parser.add_argument("--topology", type=topology_spec, default=None,
+                        help="route through routers: chain:N, dumbbell:PAIRS or mesh:RxC (there is no "
+                             "congestion control, so connections that keep losing to a full queue fail)")
+    parser.add_argument("--link-rate", type=float, default=None,
+                        help="router link rate in packets/s (the bottleneck of a dumbbell)")
+    parser.add_argument("--queue-limit", type=int, default=None, help="router queue size (packets)")
+
+
+def add_checkpoint_arguments(parser):
+    parser.add_argument("--until", type=float, default=None, help="stop at this simulated time (s)")
+    parser.add_argument("--checkpoint", default=None, help="file to save the simulation state to")
+    parser.add_argument("--checkpoint-every", type=float, default=None,
+                        help="also checkpoint every N simulated seconds")
+
+
+def print_summary(summary):
+    for key, value in summary.items():
+        if isinstance(value, float):
+            print(f"{key:>24}: {value:.6g}")
+        else:
+            print(f"{key:>24}: {value}")
+
+
+def command_run(args):
+    """Run a scenario without any GUI modules"""
+    if args.workers and args.workers > 1:
+        if (args.checkpoint or args.until is not None or args.read_rate
+                or args.compare_ack or args.ack_mode != "nack" or args.svg or args.topology
+                or args.pcap or args.stream):
+            print("--checkpoint, --until, --read-rate, --svg, --pcap, --stream, --topology and the ACK "
+                  "options need a single-process run (drop --workers)")
+            return 2
+        from sharded_simulation import run_sharded
+        try:
+            summary = run_sharded(
+                args.connections, workers=args.workers, num_packets=args.packets,
+                window_size=args.window, error_rate=args.error_rate / 100.0,
+                loss_rate=args.loss_rate / 100.0, link_delay=args.link_delay,
+                seed=args.seed if args.seed is not None else 0
+            )
+        except RuntimeError as e:
+            print(f"Sharded run failed: {e}")
+            return 1
+        print_summary(summary)
+        return 0
+
+    if args.compare_ack:
+        return compare_ack_modes(args)
+    sim = build_simulator(args)
+    try:
+        stream = attach_stream(sim, args)
+    except ValueError as e:
+        print(f"Cannot stream events: {e}")
+        return 2
+    diagrams = []
+    if args.svg:
+        from ladder_export import attach_ladders
+        diagrams = attach_ladders(sim, args.svg, range(min(args.svg_connections, args.connections)))
+    capture = attach_capture(sim, args.pcap)
+    status = run_simulation(sim, args)
+    for diagram in diagrams:
+        print(f"Wrote {diagram.close()} ({diagram.packets} packets)")
+    close_capture(capture)
+    close_stream(stream)
+    return status
+
+
+def attach_capture(sim, path, mss=None):
+    if not path:
+        return None
+    from pcap_export import PcapWriter
+    capture = PcapWriter(path) if mss is None else PcapWriter(path, mss=mss)
+    sim.add_listener(capture)
+    return capture
+
+
+def close_capture(capture):
+    if capture is not None:
+        capture.close()
+        print(f"Wrote {capture.path} ({capture.packets} packets, {capture.bytes_written} bytes)")
+
+
+def attach_stream(sim, args):
+    if not args.stream:
+        return None
+    from event_stream import EventStreamServer, SimulationPublisher
+    server = EventStreamServer(args.stream, slow_policy=args.stream_policy)
+    address = server.listener.getsockname()
+    print(f"Streaming events on {address if isinstance(address, str) else '%s:%d' % address[:2]}")
+    deadline = time.monotonic() + args.stream_wait
+    while not server.subscribers and time.monotonic() < deadline:
+        time.sleep(0.05)
+    publisher = SimulationPublisher(sim, server, args.stream_interval, packets=not args.stream_no_packets)
+    sim.add_listener(publisher)
+    return publisher
+
+
+def close_stream(publisher):
+    if publisher is not None:
+        server = publisher.server
+        if server.subscribers:
+            publisher.snapshot(final=True)
+        server.close()
+        print(f"Streamed {server.published} messages "
+              f"({server.dropped_subscribers} slow subscribers dropped)")
+
+
+def command_watch(args):
+    """Print the snapshots of a run started with --stream"""
+    import json
+    import socket
+    from event_stream import parse_address
+    try:
+        family, address = parse_address(args.address)
+    except ValueError as e:
+        print(e)
+        return 2
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(address)
+    packets = skipped = 0
+    with sock, sock.makefile("r") as stream:
+        for line in stream:
+            message = json.loads(line)
+            if message["type"] == "packet":
+                packets += 1
+            elif message["type"] == "gap":
+                skipped += message["skipped"]
+            elif message["type"] == "snapshot":
+                stats = message["stats"]
+                states = " ".join(f"{s}={n}" for s, n in sorted(message["states"].items()))
+                print(f"t={message['t']:9.3f}  sent={stats['packets_sent']:>9}  "
+                      f"retx={stats['retransmissions']:>7}  {message['throughput_Bps'] / 1000:9.1f} kB/s  "
+                      f"events={packets} (skipped {skipped})  {states}")
+                if message["final"]:
+                    break
+    return 0
+
+
+def build_simulator(args, ack_mode=None):
+    from simulator import Simulator
+    topology = None
+    if args.topology:
+        from topology import parse_topology
+        topology = parse_topology(args.topology, delay=args.link_delay, rate=args.link_rate,
+                                  queue_limit=args.queue_limit)
+    sim = Simulator(seed=args.seed, link_delay=args.link_delay, error_rate=args.error_rate / 100.0,
+                    loss_rate=args.loss_rate / 100.0, read_rate=args.read_rate,
+                    ack_mode=ack_mode or args.ack_mode, delayed_ack=args.delayed_ack,
+                    ack_every=args.ack_every, topology=topology)
+    for i in range(args.connections):
+        sim.add_connection(args.packets, args.window, start_time=i * args.link_delay / 10)
+    return sim
+
+
+def compare_ack_modes(args):
+    """Run the scenario once per ACK mode with the same seed and report the savings"""
+    if args.seed is None:
+        args.seed = 0
+    results = {}
+    for mode in ("nack", "sack"):
+        sim = build_simulator(args, ack_mode=mode)
+        sim.run(until=args.until)
+        durations = [c.completion_time - c.start_time for c in sim.connections
+                     if c.completion_time is not None]
+        results[mode] = (sim.stats["control_packets"],
+                         sum(durations) / len(durations) if durations else float("nan"),
+                         sim.stats["connections_completed"])
+
+    summary = {}
+    for mode, (control, mean_time, completed) in results.items():
+        summary[f"{mode}_control_packets"] = control
+        summary[f"{mode}_mean_completion"] = mean_time
+        summary[f"{mode}_completed"] = completed
+    (nack_control, nack_time, _), (sack_control, sack_time, _) = results["nack"], results["sack"]
+    if nack_control:
+        summary["control_saved_pct"] = 100.0 * (nack_control - sack_control) / nack_control
+    if nack_time:
+        summary["completion_saved_pct"] = 100.0 * (nack_time - sack_time) / nack_time
+    print_summary(summary)
+    return 0
+
+
+def command_resume(args):
+    """Continue a run from a checkpoint file"""
+    from checkpoint import load_checkpoint
+    sim = load_checkpoint(args.path)
+    print(f"Resumed at simulated time {sim.now:.6g}")
+    if args.checkpoint is None:
+        args.checkpoint = args.path
+    return run_simulation(sim, args)
+
+
+def run_simulation(sim, args):
+    """Run sim to the end (or --until), checkpointing along the way if asked"""
+    start = time.perf_counter()
+    if args.checkpoint:
+        from checkpoint import save_checkpoint
+        interval = args.checkpoint_every or float("inf")
+        while not sim.finished and (args.until is None or sim.now < args.until):
+            stop = sim.now + interval
+            if args.until is not None:
+                stop = min(stop, args.until)
+            sim.run(until=None if stop == float("inf") else stop)
+            save_checkpoint(sim, args.checkpoint)
+        save_checkpoint(sim, args.checkpoint)
+    else:
+        sim.run(until=args.until)
+    elapsed = time.perf_counter() - start
+
+    summary = dict(sim.stats)
+    summary.update({f"state_{s}": n for s, n in sim.state_counts().items()})
+    durations = [c.completion_time - c.start_time for c in sim.connections if c.completion_time is not None]
+    if durations:
+        summary["mean_completion_time"] = sum(durations) / len(durations)
+        summary["max_completion_time"] = max(durations)
+    summary["simulated_time"] = sim.now
+    summary["events_processed"] = sim.events_processed
+    summary["elapsed"] = elapsed
+    print_summary(summary)
+    if sim.topology is not None:
+        print_link_stats(sim.topology)
+    return 0
+
+
+def print_link_stats(topology):
+    print(f"\nRouter queues ({topology.name}):")
+    print(f"{'link':>16} {'forwarded':>10} {'dropped':>8} {'max queue':>10}")
+    for src, dst, forwarded, dropped, max_queue in topology.link_stats():
+        print(f"{src + '->' + dst:>16} {forwarded:>10} {dropped:>8} {max_queue:>10}")
+
+
+def command_transfer(args):
+    """Transfer a real file through the simulated connection and verify it"""
+    from byte_stream import ByteStreamSource
+    from simulator import Simulator
+    if args.pcap:
+        from pcap_export import MAX_PAYLOAD
+        if args.mss > MAX_PAYLOAD:
+            print(f"--pcap needs an --mss of at most {MAX_PAYLOAD} bytes (one segment per IPv4 packet)")
+            return 2
+    with ByteStreamSource(args.path, mss=args.mss) as source:
+        sim = Simulator(seed=args.seed, link_delay=args.link_delay, error_rate=args.error_rate / 100.0,
+                        loss_rate=args.loss_rate / 100.0)
+        conn = sim.add_transfer(source, args.window, output_path=args.output)
+        capture = attach_capture(sim, args.pcap, mss=args.mss)
+
+        start = time.perf_counter()
+        sim.run()
+        elapsed = time.perf_counter() - start
+        close_capture(capture)
+
+        transfer_time = (conn.completion_time or sim.now) - (conn.start_time or 0.0)
+        summary = dict(sim.stats)
+        summary["file_size"] = source.size
+        summary["segments"] = source.num_segments
+        summary["verified"] = conn.verified
+        summary["simulated_transfer_time"] = transfer_time
+        summary["simulated_goodput_Bps"] = source.size / transfer_time if transfer_time > 0 else 0.0
+        summary["elapsed"] = elapsed
+        summary["wall_clock_Bps"] = source.size / elapsed if elapsed > 0 else 0.0
+        print_summary(summary)
+        conn.close_sink()  # Only still open if the run stopped early
+    return 0 if conn.verified else 1
+
+
+def command_ladder(args):
+    """Write a ladder diagram for every combination of the swept parameters"""
+    from ladder_export import export_sweep
+    runs = [
+        {"error_rate": error / 100.0, "loss_rate": loss / 100.0, "ack_mode": mode,
+         "link_delay": args.link_delay, "seed": args.seed}
+        for error, loss, mode in itertools.product(args.error_rate, args.loss_rate, args.ack_mode)
+    ]
+    start = time.perf_counter()
+    paths = export_sweep(args.directory, runs, num_packets=args.packets, window_size=args.window,
+                         px_per_second=args.scale)
+    for path in paths:
+        print(f"Wrote {path}")
+    print(f"{len(paths)} diagrams in {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+def command_balance(args):
+    """Compare load-balancing policies on the same arrivals"""
+    from load_balancer import run_balanced
+    for policy in args.policy:
+        result = run_balanced(
+            policy, num_connections=args.connections, server_rates=args.server_rates,
+            num_clients=args.clients, num_packets=args.packets, window_size=args.window,
+            arrival_rate=args.arrival_rate, queue_limit=args.queue_limit, seed=args.seed,
+            error_rate=args.error_rate / 100.0, ack_mode=args.ack_mode
+        )
+        print(f"\n{policy}")
+        print(f"{'server':>8} {'rate':>6} {'conns':>6} {'done':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        rows = list(result["servers"].items()) + [("all", result["overall"])]
+        for name, row in rows:
+            times = " ".join(f"{row[k]:8.3f}" if row[k] is not None else f"{'-':>8}"
+                             for k in ("p50", "p90", "p99", "max"))
+            rate = f"{row['rate']:g}" if "rate" in row else ""
+            conns = row.get("connections", args.connections)
+            print(f"{name:>8} {rate:>6} {conns:>6} {row['completed']:>6} {times}")
+        overall = result["overall"]
+        print(f"failed: {overall['failed']}  queue drops: {overall['queue_drops']}")
+    return 0
+
+
+def command_bench_socket(args):
+    """Measure the loopback socket transport"""
+    from socket_transport import run_loopback_transfer
+    try:
+        summary = run_loopback_transfer(args.packets, args.window, payload_size=args.payload,
+                                        error_rate=args.error_rate / 100.0, seed=args.seed)
+    except TimeoutError as e:
+        print(f"Transfer failed: {e}")
+        return 1
+    print_summary(summary)
+    return 0
+
+
+def command_gui(args):
+    """Start the Tk application (imports tkinter only now)"""
+    from main import main as run_gui
+    run_gui()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli", description="TCP protocol simulation")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="run a headless scenario")
+    add_scenario_arguments(run)
+    run.add_argument("--workers", type=int, default=None, help="split connections across processes")
+    run.add_argument("--compare-ack", action="store_true",
+                     help="run the scenario in nack and sack mode and report the savings")
+    run.add_argument("--svg", default=None, help="write ladder diagrams (SVG) to this directory")
+    run.add_argument("--svg-connections", type=int, default=1,
+                     help="number of connections to draw with --svg")
+    run.add_argument("--pcap", default=None, help="write every packet sent to this pcap file")
+    run.add_argument("--stream", default=None,
+                     help="publish events to local subscribers on unix:PATH, [127.0.0.1:]PORT or a socket path")
+    run.add_argument("--stream-interval", type=float, default=1.0,
+                     help="seconds (wall clock) between metric snapshots")
+    run.add_argument("--stream-policy", choices=("sample", "drop"), default="sample",
+                     help="skip events for slow subscribers, or disconnect them")
+    run.add_argument("--stream-no-packets", action="store_true", help="publish snapshots only")
+    run.add_argument("--stream-wait", type=float, default=0.0,
+                     help="wait up to N seconds for a first subscriber before starting")
+    add_checkpoint_arguments(run)
+    run.set_defaults(handler=command_run)
+
+    resume = commands.add_parser("resume", help="continue a run from a checkpoint")
+    resume.add_argument("path", help="checkpoint file written by run --checkpoint")
+    add_checkpoint_arguments(resume)
+    resume.set_defaults(handler=command_resume)
+
+    transfer = commands.add_parser("transfer", help="send a real file and check its hash")
+    transfer.add_argument("path", help="file the server sends")
+    transfer.add_argument("--output", default=None, help="write the received bytes to this file")
+    transfer.add_argument("--window", type=int, default=64, help="receive window size (packets)")
+    transfer.add_argument("--mss", type=int, default=1400, help="bytes per DATA segment")
+    transfer.add_argument("--error-rate", type=float, default=0.0, help="packet corruption rate (%%)")
+    transfer.add_argument("--loss-rate", type=float, default=0.0, help="packet loss rate (%%)")
+    transfer.add_argument("--link-delay", type=float, default=0.05, help="one-way link delay (s)")
+    transfer.add_argument("--seed", type=int, default=None)
+    transfer.add_argument("--pcap", default=None, help="write every packet sent to this pcap file")
+    transfer.set_defaults(handler=command_transfer)
+
+    ladder = commands.add_parser("ladder", help="write ladder diagrams for a parameter sweep")
+    ladder.add_argument("directory", help="output directory for the SVG files")
+    ladder.add_argument("--packets", type=int, default=20, help="packets requested per run")
+    ladder.add_argument("--window", type=int, default=4, help="receive window size (packets)")
+    ladder.add_argument("--error-rate", type=float, nargs="+", default=[10.0],
+                        help="corruption rates to sweep (%%)")
+    ladder.add_argument("--loss-rate", type=float, nargs="+", default=[0.0],
+                        help="loss rates to sweep (%%)")
+    ladder.add_argument("--ack-mode", nargs="+", choices=("nack", "sack"), default=["nack"])
+    ladder.add_argument("--link-delay", type=float, default=0.05, help="one-way link delay (s)")
+    ladder.add_argument("--scale", type=float, default=400.0, help="pixels per simulated second")
+    ladder.add_argument("--seed", type=int, default=0)
+    ladder.set_defaults(handler=command_ladder)
+
+    balance = commands.add_parser("balance", help="compare load-balancing policies over a server pool")
+    balance.add_argument("--policy", nargs="+", default=["round-robin", "least-connections", "consistent-hash"],
+                         choices=("round-robin", "least-connections", "consistent-hash"))
+    balance.add_argument("--connections", type=int, default=200, help="connections opened through the balancer")
+    balance.add_argument("--clients", type=int, default=16, help="number of client hosts")
+    balance.add_argument("--server-rates", type=float, nargs="+", default=[400.0, 200.0, 200.0, 100.0],
+                         help="packets/s each server can send (one value per server)")
+    balance.add_argument("--arrival-rate", type=float, default=20.0, help="new connections per second")
+    balance.add_argument("--packets", type=int, default=20, help="packets requested per connection")
+    balance.add_argument("--window", type=int, default=4, help="receive window size (packets)")
+    balance.add_argument("--queue-limit", type=int, default=32, help="server queue size (packets)")
+    balance.add_argument("--error-rate", type=float, default=0.0, help="packet corruption rate (%%)")
+    balance.add_argument("--ack-mode", choices=("nack", "sack"), default="nack")
+    balance.add_argument("--seed", type=int, default=0)
+    balance.set_defaults(handler=command_balance)
+
+    bench = commands.add_parser("bench-socket", help="benchmark the loopback UDP transport")
+    bench.add_argument("--packets", type=int, default=100000)
+    bench.add_argument("--window", type=int, default=64)
+    bench.add_argument("--payload", type=int, default=1400, help="payload bytes per packet")
+    bench.add_argument("--error-rate", type=float, default=0.0, help="packet corruption rate (%%)")
+    bench.add_argument("--seed", type=int, default=None)
+    bench.set_defaults(handler=command_bench_socket)
+
+    watch = commands.add_parser("watch", help="print the snapshots of a run started with --stream")
+    watch.add_argument("address", help="the unix:PATH, [127.0.0.1:]PORT or socket path given to run --stream")
+    watch.set_defaults(handler=command_watch)
+
+    gui = commands.add_parser("gui", help="open the graphical simulation")
+    gui.set_defaults(handler=command_gui)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "handler", None):
+        parser.print_help()
+        return 1
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
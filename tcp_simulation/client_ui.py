@@ -2,6 +2,7 @@
 # Handles the client side of the UI
 
 import tkinter as tk
+from event_manager import DeferredLog
 from constants import DISCONNECTED, CONNECTED
 
 class ClientUI:
@@ -12,6 +13,9 @@ class ClientUI:
         
         # State variables
         self.state = DISCONNECTED
+
+        # Log lines and status changes held back while fast-forwarding
+        self.deferred = DeferredLog(event_manager, self.write_log)
         
         # Initialize UI components
         self.setup_ui()
@@ -46,6 +50,13 @@ class ClientUI:
         self.num_packets_var = tk.StringVar(value="5")
         tk.Entry(packet_frame, textvariable=self.num_packets_var, width=5).pack(side=tk.LEFT)
 
+        # File to request (optional, overrides the packet count)
+        file_frame = tk.Frame(controls_frame)
+        file_frame.pack(fill=tk.X, pady=2)
+        tk.Label(file_frame, text="File (optional):").pack(side=tk.LEFT)
+        self.file_path_var = tk.StringVar(value="")
+        tk.Entry(file_frame, textvariable=self.file_path_var, width=20).pack(side=tk.LEFT)
+
         # Window size
         window_frame = tk.Frame(controls_frame)
         window_frame.pack(fill=tk.X, pady=2)
@@ -72,6 +83,9 @@ class ClientUI:
     
     def update_status(self):
         """Update the status display based on current state"""
+        if self.deferred.defer_status():
+            return
+
         def _update():
             self.status_label.config(text=self.state)
             if self.state == DISCONNECTED:
@@ -91,14 +105,21 @@ class ClientUI:
     
     def log_message(self, message):
         """Add message to the client log"""
-        def _log():
-            self.log.insert(tk.END, f"{message}\n")
-            self.log.see(tk.END)
-        
-        self.event_manager.queue_event(_log)
+        self.deferred.add(message)
+
+    def write_log(self, text):
+        """Append text to the log widget (Tk thread only)"""
+        self.log.insert(tk.END, text)
+        self.log.see(tk.END)
+    
+    def flush_deferred(self):
+        """Write the log lines and status held back during fast-forward in one batch"""
+        if self.deferred.flush():
+            self.update_status()
     
     def clear_log(self):
-        """Clear the log contents"""
+        """Clear the log contents, including lines held back by fast-forward"""
+        self.deferred.clear()
         def _clear():
             self.log.delete(1.0, tk.END)
         
@@ -132,6 +153,9 @@ class ClientUI:
         except ValueError:
             return 5  # Default value
     
+    def get_file_path(self):
+        return self.file_path_var.get().strip() or None
+
     def get_window_size(self):
         try:
             return int(self.window_size_var.get())
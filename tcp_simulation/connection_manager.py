@@ -5,9 +5,9 @@ import threading
 import time
 import random
 from constants import *
-import network_ui
-import tkinter as tk
 from packet_model import Packet  # Ensure Packet is imported from the correct module
+from byte_stream import ByteStreamSource, ReassemblyBuffer
+from pcap_export import PcapWriter
 
 class ConnectionManager:
     # Shared state for received packets
@@ -26,15 +26,55 @@ class ConnectionManager:
         self.client_ui.close_handler = self.close_connection
         self.client_ui.reset_handler = self.reset_client
         self.server_ui.reset_handler = self.reset_server
+        if network_ui is not None:
+            network_ui.fast_forward_handler = self.set_fast_forward
+            network_ui.capture_handler = self.set_capture
+        self.capture = None
 
         self.timeout = 5.0
         self.packet_error_rate = 0.1
         self.connection_timeout = None
+        self.time_wait_timer = None
 
         self.reset_connection_state()
 
+    def cancel_timers(self):
+        """Cancel any pending SYN or TIME_WAIT timer"""
+        self.event_manager.cancel_timer(self.connection_timeout)
+        self.event_manager.cancel_timer(self.time_wait_timer)
+        self.connection_timeout = None
+        self.time_wait_timer = None
+
+    def set_fast_forward(self, active):
+        """Switch drawing off, or rebuild canvas, logs and status labels in one batch"""
+        self.animation_manager.set_fast_forward(active)
+        if not active:
+            self.client_ui.flush_deferred()
+            self.server_ui.flush_deferred()
+
+    def set_capture(self, path):
+        """Start writing every packet sent to a pcap file, or stop with None"""
+        if self.capture is not None:
+            self.event_manager.remove_packet_listener(self.capture)
+            self.capture.close()
+            self.client_ui.log_message(f"Captured {self.capture.packets} packets to {self.capture.path}")
+            self.capture = None
+        if path:
+            self.capture = PcapWriter(path)
+            self.event_manager.add_packet_listener(self.capture)
+            self.client_ui.log_message(f"Capturing packets to {path}")
+
+    def record_window(self, size, resent):
+        """Chart a window sent and the packets resent in it - runs in main thread"""
+        metrics = self.event_manager.metrics
+        metrics.window.record(self.animation_manager.sim_time, size)
+        if resent:
+            metrics.retransmissions.add(self.animation_manager.sim_time, resent)
+
     def reset_connection_state(self):
         """Complete connection state reset"""
+        self.cancel_timers()
+
         # Reset packet state
         with self.event_manager.packet_processing_lock:
             ConnectionManager.received_packets = {}
@@ -42,6 +82,7 @@ class ConnectionManager:
         
         # Reset event flags
         self.event_manager.reset()
+        self.event_manager.queue_event(self.event_manager.metrics.clear)
         
         # Reset UI states
         self.client_ui.set_state(DISCONNECTED)
@@ -86,10 +127,9 @@ class ConnectionManager:
         self.client_ui.log_message(f"Sending {syn_packet}")
         self.send_packet_from_client(syn_packet)
 
-        self.connection_timeout = threading.Timer(15.0, self.handle_syn_timeout)
-        self.connection_timeout.start()
+        self.connection_timeout = self.event_manager.set_timer(SYN_TIMEOUT, self.handle_syn_timeout)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.client_ui.log_message("Timeout waiting for server to receive SYN")
             return
 
@@ -104,7 +144,7 @@ class ConnectionManager:
         self.server_ui.log_message("Sending SYN+ACK")
         self.send_packet_from_server(syn_ack)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.server_ui.log_message("Timeout waiting for client to receive SYN-ACK")
             return
 
@@ -117,10 +157,9 @@ class ConnectionManager:
         self.client_ui.log_message("Sending ACK")
         self.send_packet_from_client(ack)
 
-        if self.connection_timeout:
-            self.connection_timeout.cancel()
+        self.event_manager.cancel_timer(self.connection_timeout)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.client_ui.log_message("Timeout waiting for server to receive ACK")
             return
 
@@ -143,12 +182,40 @@ class ConnectionManager:
     def data_transfer_process(self):
         num_packets = self.client_ui.get_packet_count()
         window_size = self.client_ui.get_window_size()
+
+        # A requested file is sent as zero-copy segments of its memory mapping
+        source = sink = None
+        file_path = self.client_ui.get_file_path()
+        if file_path:
+            try:
+                source = ByteStreamSource(file_path)
+            except OSError as e:
+                self.client_ui.log_message(f"Cannot open {file_path}: {e}")
+                return
+            sink = ReassemblyBuffer(source.size, source.mss)
+            num_packets = source.num_segments
+            self.client_ui.log_message(f"Requesting {file_path} ({source.size} bytes)")
+
+        # Every exit (timeouts, stop, success) releases the mapping and buffer
+        try:
+            self.transfer_windows(num_packets, window_size, source, sink)
+        finally:
+            if sink is not None:
+                sink.close()
+                source.close()
+
+    def transfer_windows(self, num_packets, window_size, source, sink):
+        """Window request, then windows of DATA, each answered by one cumulative ACK
+        whose SACK/BAD lists get corrupt packets resent with the next window"""
         self.client_ui.log_message(f"Requesting {num_packets} packets with window size {window_size}")
 
+        started = self.animation_manager.sim_time
         window_packet = Packet(ACK, 0, f"WINDOW:{window_size}")
         self.send_packet_from_client(window_packet)
+        control = 1  # Non-DATA packets sent during the transfer
+        new_data_windows = damaged_windows = resent = 0
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.client_ui.log_message("Timeout waiting for server to receive window info")
             return
 
@@ -157,16 +224,25 @@ class ConnectionManager:
 
         delivered = 0
         seq = 1
+        pending = []  # Corrupt packets reported by the last ACK, resent with the next window
 
-        while delivered < num_packets and not self.event_manager.stop_flag:
-            batch = min(window_size, num_packets - delivered)
-            self.server_ui.log_message(f"Sending window of {batch} packets")
+        while (delivered < num_packets or pending) and not self.event_manager.stop_flag:
+            batch = min(window_size - len(pending), num_packets - delivered)
+            if pending:
+                self.server_ui.log_message(f"Sending window of {batch} packets and {len(pending)} resends")
+            else:
+                self.server_ui.log_message(f"Sending window of {batch} packets")
             window_packets = {}
+            resent += len(pending)
+            if batch:
+                new_data_windows += 1
 
-            # Send window of packets
+            # Resends of the reported packets ride along with the next window
+            for p_seq in pending:
+                window_packets[p_seq] = Packet(DATA, p_seq, source.segment(p_seq) if source else f"Data packet {p_seq} (resend)")
             for i in range(batch):
                 p_seq = seq + i
-                packet = Packet(DATA, p_seq, f"Data packet {p_seq}")
+                packet = Packet(DATA, p_seq, source.segment(p_seq) if source else f"Data packet {p_seq}")
                 if random.random() < self.packet_error_rate:
                     packet.is_corrupt = True
                     self.server_ui.log_message(f"Packet {p_seq} is corrupt!")
@@ -177,85 +253,89 @@ class ConnectionManager:
                     if p_seq in ConnectionManager.received_packets:
                         del ConnectionManager.received_packets[p_seq]
 
-            for packet in window_packets.values():
-                self.server_ui.log_message(f"Queueing {packet}")
+            # The charts are read on the Tk thread, so record there too
+            self.event_manager.queue_event(
+                lambda size=len(window_packets), resent=len(pending): self.record_window(size, resent))
+            for p_seq, packet in window_packets.items():
+                if p_seq in pending:
+                    self.server_ui.log_message(f"Queueing resend for packet {p_seq}")
+                else:
+                    self.server_ui.log_message(f"Queueing {packet}")
                 self.animation_manager.queue_packet("server_to_client", packet)
 
             self.event_manager.packet_sent.set()
 
             # Wait for window with timeout handling
-            if not self.wait_for_window(seq, batch):
+            if not self.wait_for_window(window_packets):
                 self.client_ui.log_message("Timeout waiting for window")
                 return
 
-            # Check for corrupted packets
-            corrupt = []
+            # Check for corrupted packets; keep the good ones
             with self.event_manager.packet_processing_lock:
-                for p_seq in range(seq, seq + batch):
-                    if p_seq in ConnectionManager.received_packets and ConnectionManager.received_packets[p_seq].is_corrupt:
-                        corrupt.append(p_seq)
+                corrupt = [p_seq for p_seq in window_packets
+                           if ConnectionManager.received_packets[p_seq].is_corrupt]
+                if sink is not None:
+                    for p_seq in window_packets:
+                        if p_seq not in corrupt:
+                            sink.write(p_seq, ConnectionManager.received_packets[p_seq].data)
+            seq += batch
+            delivered += batch
 
+            # One cumulative ACK per window, up to the first corrupt packet; the
+            # rest of the window is listed as SACK ranges and the corrupt packets
+            # as BAD, so no separate NACK round trip is needed
             if corrupt:
-                # Handle corrupted packets
+                corrupt.sort()
+                damaged_windows += 1
                 self.client_ui.log_message(f"Detected corrupt packets: {corrupt}")
-                nack = Packet(NACK, seq, f"NACK:{','.join(map(str, corrupt))}")
-                self.client_ui.log_message(f"Sending NACK for packets: {corrupt}")
-                self.send_packet_from_client(nack)
-
-                if not self.event_manager.wait_for_packet(timeout=15.0):
-                    self.client_ui.log_message("Timeout waiting for NACK handling")
-                    return
-
-                # Resend only corrupted packets
-                for p_seq in corrupt:
-                    if p_seq in ConnectionManager.received_packets:
-                        del ConnectionManager.received_packets[p_seq]
-                    resend = Packet(DATA, p_seq, f"Data packet {p_seq} (resend)")
-                    self.server_ui.log_message(f"Queueing resend for packet {p_seq}")
-                    self.animation_manager.queue_packet("server_to_client", resend)
-
-                self.event_manager.packet_sent.set()
-
-                # Wait for resend with timeout handling
-                if not self.wait_for_window(min(corrupt), len(corrupt)):
-                    self.client_ui.log_message("Timeout waiting for resend")
-                    return
-
-            # Send ACK for the window
-            ack = Packet(ACK, seq + batch - 1)
-            self.client_ui.log_message(f"Sending {ack}")
+                blocks = []
+                for p_seq in range(corrupt[0] + 1, seq):
+                    if p_seq in corrupt:
+                        continue
+                    if blocks and blocks[-1][1] == p_seq - 1:
+                        blocks[-1][1] = p_seq
+                    else:
+                        blocks.append([p_seq, p_seq])
+                fields = [f"SACK:{','.join(f'{a}-{b}' for a, b in blocks)}"] if blocks else []
+                fields.append(f"BAD:{','.join(map(str, corrupt))}")
+                ack = Packet(ACK, corrupt[0] - 1, ";".join(fields))
+                self.client_ui.log_message(f"Sending {ack} ({ack.data})")
+            else:
+                ack = Packet(ACK, seq - 1)
+                self.client_ui.log_message(f"Sending {ack}")
             self.send_packet_from_client(ack)
+            control += 1
 
-            if not self.event_manager.wait_for_packet(timeout=15.0):
+            if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
                 self.client_ui.log_message("Timeout waiting for server to receive ACK")
                 return
 
             self.server_ui.log_message(f"Received {ack}")
-            seq += batch
-            delivered += batch
+            pending = corrupt
 
         self.client_ui.log_message("All packets received successfully")
         self.server_ui.log_message("All packets delivered successfully")
+        if not self.event_manager.stop_flag:
+            # A separate NACK per damaged window was the scheme before SACK/BAD
+            nack_control = 1 + new_data_windows + damaged_windows
+            self.client_ui.log_message(
+                f"Transfer took {self.animation_manager.sim_time - started:.1f}s (simulated): "
+                f"{num_packets} DATA packets, {resent} resent, {control} control packets "
+                f"(per-window NACKs: {nack_control})")
+
+        if sink is not None and delivered >= num_packets:
+            if sink.digest() == source.digest():
+                self.client_ui.log_message(f"SHA-256 verified ({source.size} bytes)")
+            else:
+                self.client_ui.log_message("SHA-256 mismatch: received file is corrupt")
 
-    def wait_for_window(self, start_seq, count):
-        """Wait for all packets in window to be received"""
-        deadline = time.time() + 15.0
-        while time.time() < deadline and not self.event_manager.stop_flag:
+    def wait_for_window(self, seqs):
+        """Wait for every packet in seqs to be received"""
+        def received_all():
             with self.event_manager.packet_processing_lock:
-                # Check if we've received all packets in window
-                received_all = True
-                for seq in range(start_seq, start_seq + count):
-                    if seq not in ConnectionManager.received_packets:
-                        received_all = False
-                        break
-                
-                if received_all:
-                    return True
-                
-            self.event_manager.packet_received.wait(0.2)
-            self.event_manager.packet_received.clear()
-        
-        return False
+                return all(seq in ConnectionManager.received_packets for seq in seqs)
+
+        return self.event_manager.wait_until(received_all, DELIVERY_TIMEOUT)
 
     def close_connection(self):
         if self.client_ui.state != CONNECTED:
@@ -271,7 +351,7 @@ class ConnectionManager:
         self.client_ui.log_message(f"Sending {fin}")
         self.send_packet_from_client(fin)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.client_ui.log_message("Timeout waiting for server to receive FIN")
             return
 
@@ -283,7 +363,7 @@ class ConnectionManager:
         self.server_ui.log_message(f"Sending {fin_ack}")
         self.send_packet_from_server(fin_ack)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.server_ui.log_message("Timeout waiting for client to receive FIN-ACK")
             return
 
@@ -294,7 +374,12 @@ class ConnectionManager:
         self.client_ui.log_message(f"Sending final {final_ack}")
         self.send_packet_from_client(final_ack)
 
-        if not self.event_manager.wait_for_packet(timeout=15.0):
+        self.client_ui.set_state(TIME_WAIT)
+        self.client_ui.log_message(f"Entering TIME_WAIT for {TIME_WAIT_DURATION:.0f} seconds")
+        self.time_wait_timer = self.event_manager.set_timer(self.sim_delay(TIME_WAIT_DURATION),
+                                                            self.handle_time_wait_expired)
+
+        if not self.event_manager.wait_for_packet(DELIVERY_TIMEOUT):
             self.client_ui.log_message("Timeout waiting for server to receive final ACK")
             return
 
@@ -303,12 +388,18 @@ class ConnectionManager:
         self.server_ui.log_message("Closing connection")
         self.server_ui.set_state(DISCONNECTED)
 
+    def handle_time_wait_expired(self):
+        if self.client_ui.state == TIME_WAIT:
+            self.client_ui.log_message("TIME_WAIT expired: connection closed")
+            self.client_ui.set_state(DISCONNECTED)
+
     def reset_client(self):
         """Proper client reset implementation"""
         print("Performing complete client reset...")
         
         # Stop all ongoing operations
         self.event_manager.stop_flag = True
+        self.cancel_timers()
         
         # Clear all packet state
         with self.event_manager.packet_processing_lock:
@@ -334,6 +425,7 @@ class ConnectionManager:
         
         # Stop all ongoing operations
         self.event_manager.stop_flag = True
+        self.cancel_timers()
         
         # Clear all packet state
         with self.event_manager.packet_processing_lock:
@@ -368,17 +460,25 @@ class ConnectionManager:
         self.event_manager.packet_sent.wait(timeout=5.0)
         self.event_manager.packet_received.wait(timeout=10.0)
 
+    def sim_delay(self, seconds):
+        """Wall-clock length of a simulated pause at the current speed"""
+        if self.event_manager.fast_forward:
+            return seconds / self.event_manager.fast_forward
+        return seconds
+
     def sim_sleep(self, seconds):
-        end = time.time() + seconds
-        while time.time() < end and not self.event_manager.stop_flag:
-            if not self.event_manager.paused:
-                time.sleep(0.05)
-            else:
-                time.sleep(0.1)
+        end = time.time() + self.sim_delay(seconds)
+        while not self.event_manager.stop_flag:
+            remaining = end - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 0.1 if self.event_manager.paused else 0.05))
 
 
     def update_client_ui_state(self):
         """Force synchronization between logic and UI state"""
+        import tkinter as tk  # Deferred so headless use never loads Tk
+
         def _update():
             self.client_ui.status_label.config(text=self.client_ui.state)
             if self.client_ui.state == DISCONNECTED:
@@ -10,12 +10,37 @@ NACK = "NACK"
 FIN = "FIN"
 FIN_ACK = "FIN+ACK"
 CLOSED = "CLOSED"
+PROBE = "PROBE"  # Zero-window probe from the sender
 
 # Connection states
 DISCONNECTED = "DISCONNECTED"
 CONNECTING = "CONNECTING"
 CONNECTED = "CONNECTED"
 CLOSING = "CLOSING"
+TIME_WAIT = "TIME_WAIT"
+
+# Protocol timers (seconds)
+SYN_TIMEOUT = 15.0
+TIME_WAIT_DURATION = 30.0  # Client waits this long after the final ACK before closing
+DELIVERY_TIMEOUT = 15.0  # GUI gives up on a packet or window not delivered within this
+
+# Animation timing: packets cross the link in a fixed amount of simulated
+# time, advanced in fixed steps by the Tk frame scheduler
+LINK_TRANSIT_TIME = 2.5     # Simulated seconds for one crossing at speed 1.0
+FRAME_INTERVAL = 0.02       # Fixed timestep / frame budget (50 FPS)
+MAX_STEPS_PER_FRAME = 5     # Catch-up limit; further lag is dropped
+
+# Fast-forward: protocol runs this many times faster with drawing switched
+# off; "Run to end" delivers every packet as soon as it is sent
+FAST_FORWARD_FACTORS = (
+    ("Off", 0),
+    ("10x", 10),
+    ("100x", 100),
+    ("1000x", 1000),
+    ("10000x", 10000),
+    ("Run to end", float("inf"))
+)
+FAST_FORWARD_LOG_LINES = 500  # Log lines kept per side while fast-forwarding
 
 # Packet colors for UI
 PACKET_COLORS = {
@@ -26,5 +51,23 @@ PACKET_COLORS = {
     NACK: "red",
     FIN: "purple",
     FIN_ACK: "magenta",
-    CLOSED: "gray"
+    CLOSED: "gray",
+    PROBE: "brown"
 }
+
+# Wire codes used when packets travel over real sockets
+PACKET_TYPE_CODES = {
+    SYN: 1,
+    SYN_ACK: 2,
+    ACK: 3,
+    DATA: 4,
+    NACK: 5,
+    FIN: 6,
+    FIN_ACK: 7,
+    CLOSED: 8,
+    PROBE: 9
+}
+PACKET_TYPES_BY_CODE = {code: name for name, code in PACKET_TYPE_CODES.items()}
+
+# Maximum segment size (payload bytes per DATA packet)
+DEFAULT_MSS = 1400
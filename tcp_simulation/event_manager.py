@@ -4,6 +4,11 @@
 import queue
 import threading
 import time  
+from collections import deque
+from constants import FAST_FORWARD_LOG_LINES
+from timer_wheel import TimerWheel
+from time_series import RunMetrics
+
 class EventManager:
     def __init__(self):
         self.event_queue = queue.Queue()
@@ -14,13 +19,47 @@ class EventManager:
         self.lock = threading.Lock()              # General purpose lock
         self.stop_flag = False
         self.paused = False
+        self.fast_forward = 0  # Fast-forward factor; 0 when drawing normally
+
+        # Charted series, recorded against the animation's simulated clock
+        self.metrics = RunMetrics()
+
+        # Packet listeners, same call signature as Simulator listeners
+        self.packet_listeners = []
+        self.listener_lock = threading.Lock()
+
+        # Protocol timers, fired from the main thread by process_events
+        self.timers = TimerWheel(tick=0.01, start=time.monotonic(), thread_safe=True)
+
+    def set_timer(self, delay, callback, *args):
+        """Start a cancellable timer that fires delay seconds from now"""
+        return self.timers.schedule_at(time.monotonic() + delay, callback, *args)
+
+    def cancel_timer(self, timer):
+        """Cancel a timer returned by set_timer (None is ignored)"""
+        self.timers.cancel(timer)
+
+    def add_packet_listener(self, listener):
+        with self.listener_lock:
+            self.packet_listeners.append(listener)
+
+    def remove_packet_listener(self, listener):
+        with self.listener_lock:
+            self.packet_listeners.remove(listener)
+
+    def notify_packet(self, direction, packet, sim_time):
+        """Report a packet handed to the animation (called from protocol threads)"""
+        with self.listener_lock:
+            for listener in self.packet_listeners:
+                listener("send", 0, direction, packet, sim_time, sim_time)
 
     def queue_event(self, event_func):
         """Add an event to be processed in the main thread"""
         self.event_queue.put(event_func)
     
     def process_events(self, count=10):
-        """Process a batch of events from the queue"""
+        """Fire due timers, then process a batch of events from the queue"""
+        self.timers.fire(time.monotonic())
         try:
             for _ in range(count):  # Process a limited number of events per cycle
                 if not self.event_queue.empty():
@@ -30,20 +69,33 @@ class EventManager:
             pass
     
     def wait_for_packet(self, timeout=None):
-        """Wait for a packet to be received"""
-        start_time = time.time()  # Changed from threading.time.time()
-        while True:
-            if self.packet_received.is_set():
+        """Wait for a packet to be received; wakes as soon as the frame
+        scheduler delivers one, checking the stop flag every 0.1 s"""
+        return self.wait_until(None, timeout)
+
+    def wait_until(self, condition, timeout=None):
+        """Wait until condition() holds (None: the next packet arrives).
+
+        The timeout is a timer on the wheel, fired by process_events like the
+        protocol timers; returns False once it fires or the stop flag is set.
+        """
+        expired = threading.Event()
+        timer = self.set_timer(timeout, expired.set) if timeout else None
+        try:
+            while not self.stop_flag and not expired.is_set():
+                if condition is None:
+                    if self.packet_received.wait(0.1):
+                        self.packet_received.clear()
+                        return True
+                    continue
+                # Clear before checking, so an arrival after the check wakes the wait
                 self.packet_received.clear()
-                return True
-            
-            if timeout and (time.time() - start_time) > timeout:
-                return False
-                
-            time.sleep(0.1)
-            
-            if self.stop_flag:
-                return False
+                if condition():
+                    return True
+                self.packet_received.wait(0.1)
+            return False
+        finally:
+            self.cancel_timer(timer)
     
     def toggle_pause(self):
         """Toggle the pause state"""
@@ -63,4 +115,68 @@ class EventManager:
                 try:
                     self.event_queue.get_nowait()
                 except queue.Empty:
-                    break
\ No newline at end of file
+                    break
+
+
+class DeferredLog:
+    def __init__(self, event_manager, write, max_lines=FAST_FORWARD_LOG_LINES):
+        """Log lines and status changes of one UI side, held back while fast-forwarding.
+
+        write(text) runs on the Tk thread. One lock covers the fast-forward
+        check with the append, and the flush with queueing its batch, so a
+        protocol thread can neither append to a buffer that was just flushed
+        nor get its line on screen ahead of older deferred ones.
+        """
+        self.event_manager = event_manager
+        self.write = write
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.status_stale = False
+        self.holding = False  # Lines are held until the next flush
+        self.lock = threading.Lock()
+
+    def add(self, message):
+        """Show message, or hold it back while fast-forward is on (any thread)"""
+        with self.lock:
+            if not (self.event_manager.fast_forward or self.holding):
+                self.event_manager.queue_event(lambda: self.write(f"{message}\n"))
+                return
+            self.holding = True
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(message)
+
+    def defer_status(self):
+        """True (and remember the change) if a status update must wait for the flush"""
+        with self.lock:
+            if self.event_manager.fast_forward or self.holding:
+                self.holding = True
+                self.status_stale = True
+                return True
+            return False
+
+    def flush(self):
+        """Queue the held lines as one write; returns True if the status must be redrawn"""
+        with self.lock:
+            lines = list(self.lines)
+            if self.dropped:
+                lines.insert(0, f"... {self.dropped} messages skipped during fast-forward")
+            if lines:
+                text = "".join(f"{line}\n" for line in lines)
+                self.event_manager.queue_event(lambda: self.write(text))
+            status_stale = self.status_stale
+            self.lines.clear()
+            self.dropped = 0
+            self.status_stale = False
+            self.holding = False
+        return status_stale
+
+    def clear(self):
+        """Forget held lines and any pending status redraw (the log itself is
+        cleared by the caller); lines are held again only while fast-forwarding"""
+        with self.lock:
+            self.lines.clear()
+            self.dropped = 0
+            self.status_stale = False
+            self.holding = False
+
@@ -0,0 +1,273 @@
+# event_stream.py
+# Publishes a running simulation to local monitoring clients as
+# newline-delimited JSON over a Unix-domain or loopback TCP socket
+
+import json
+import os
+import selectors
+import socket
+import stat
+import threading
+import time
+from collections import deque
+
+SLOW_POLICIES = ("sample", "drop")
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+SEND_BATCH = 256  # Lines joined into one send() call
+
+# Packet events are the bulk of the stream, so they skip json.dumps
+PACKET_EVENT = '{"type":"packet","event":"%s","t":%r,"conn":%d,"dir":"%s","ptype":"%s","seq":%s,"corrupt":%s}\n'
+
+
+def parse_address(address):
+    """(family, address) for "unix:PATH", "tcp:HOST:PORT" or "[HOST:]PORT";
+    anything else that is not a port number is taken as a Unix socket path"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.removeprefix("tcp:").rpartition(":")
+    host = host.strip("[]") or "127.0.0.1"
+    if not port.isdigit() or "/" in host:
+        if address.startswith("tcp:"):
+            raise ValueError(f"Bad address {address!r} (use tcp:HOST:PORT)")
+        return socket.AF_UNIX, address
+    return (socket.AF_INET6 if ":" in host else socket.AF_INET), (host, int(port))
+
+
+def is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def open_listener(address):
+    """Listening socket for an address accepted by parse_address, on loopback only"""
+    family, sockaddr = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(sockaddr):
+            if not is_socket(sockaddr):
+                raise ValueError(f"{sockaddr} exists and is not a socket; not replacing it")
+            os.unlink(sockaddr)  # Left behind by an earlier run
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(sockaddr)
+    else:
+        if sockaddr[0] not in LOCAL_HOSTS:
+            raise ValueError(f"Event streams are local only; cannot listen on {sockaddr[0]}")
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(sockaddr)
+    sock.listen(16)
+    sock.setblocking(False)
+    return sock
+
+
+class Subscriber:
+    __slots__ = ("sock", "queue", "pending", "skipped", "closing", "writing")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.queue = deque()
+        self.pending = b""   # Tail of a partial send
+        self.skipped = 0     # Events not sent since the queue overflowed
+        self.closing = False
+        self.writing = True  # Registered for EVENT_WRITE (the hello is queued at once)
+
+
+class EventStreamServer:
+    def __init__(self, address, max_queue=4096, slow_policy="sample", poll_interval=0.02):
+        """Fan out published messages to every connected client.
+
+        publish() only appends to per-subscriber queues; a background thread
+        does all socket I/O, so a slow or stalled client never blocks the
+        simulation. A subscriber whose queue holds max_queue lines is either
+        sampled (further events are skipped and reported as a gap once it
+        catches up; snapshots still go through) or dropped, per slow_policy.
+        """
+        if slow_policy not in SLOW_POLICIES:
+            raise ValueError(f"slow_policy must be one of {SLOW_POLICIES}, not {slow_policy!r}")
+        self.address = address
+        self.max_queue = max_queue
+        self.slow_policy = slow_policy
+        self.poll_interval = poll_interval
+        self.subscribers = {}
+        self._woken = []  # Subscribers whose queue went from empty to non-empty
+        self.published = 0
+        self.dropped_subscribers = 0
+        self.lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.listener = open_listener(address)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self._stop = False
+        self.thread = threading.Thread(target=self._serve, name="event-stream", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def encode(message):
+        return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+    def publish(self, message, droppable=True):
+        """Queue message for every subscriber; events (droppable) may be skipped
+        for slow subscribers, snapshots are always queued"""
+        if self.subscribers:
+            self.publish_line(self.encode(message), droppable)
+
+    def publish_line(self, line, droppable=True):
+        """publish() for a message already encoded as one JSON line"""
+        if not self.subscribers:
+            return
+        self.published += 1
+        with self.lock:
+            for sub in self.subscribers.values():
+                if not sub.writing:
+                    sub.writing = True
+                    self._woken.append(sub)
+                backlog = len(sub.queue)
+                if backlog >= self.max_queue and (droppable or backlog >= 2 * self.max_queue):
+                    if self.slow_policy == "drop" or not droppable:
+                        sub.closing = True
+                    else:
+                        sub.skipped += 1
+                    continue
+                if sub.skipped and (not droppable or backlog < self.max_queue // 2):
+                    sub.queue.append(self.encode({"type": "gap", "skipped": sub.skipped}))
+                    sub.skipped = 0
+                sub.queue.append(line)
+
+    def _serve(self):
+        selector = self.selector
+        while not self._stop:
+            # Ask for writability only while something is waiting to be sent:
+            # publish_line wakes idle subscribers, _write idles drained ones
+            with self.lock:
+                woken, self._woken = self._woken, []
+            for sub in woken:
+                if sub.sock in self.subscribers:
+                    selector.modify(sub.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, sub)
+            for key, events in selector.select(self.poll_interval):
+                if key.fileobj is self.listener:
+                    self._accept()
+                    continue
+                sub = key.data
+                if events & selectors.EVENT_READ:
+                    self._read(sub)
+                if events & selectors.EVENT_WRITE and sub.sock in self.subscribers and not sub.closing:
+                    self._write(sub)
+            with self.lock:
+                closing = [sub for sub in self.subscribers.values() if sub.closing]
+            for sub in closing:
+                self._remove(sub, dropped=True)
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sub = Subscriber(sock)
+        sub.queue.append(self.encode({"type": "hello", "version": 1, "slow_policy": self.slow_policy}))
+        with self.lock:
+            self.subscribers[sock] = sub
+        self.selector.register(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, sub)
+
+    def _read(self, sub):
+        # Clients have nothing to say; a read only tells us they went away
+        try:
+            data = sub.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._remove(sub)
+
+    def _write(self, sub):
+        if not sub.pending:
+            with self.lock:
+                batch = [sub.queue.popleft() for _ in range(min(SEND_BATCH, len(sub.queue)))]
+            sub.pending = b"".join(batch)
+        try:
+            sent = sub.sock.send(sub.pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._remove(sub)
+            return
+        sub.pending = sub.pending[sent:]
+        if not sub.pending:
+            with self.lock:
+                if sub.queue:
+                    return
+                sub.writing = False
+            self.selector.modify(sub.sock, selectors.EVENT_READ, sub)
+
+    def _remove(self, sub, dropped=False):
+        with self.lock:
+            if self.subscribers.pop(sub.sock, None) is None:
+                return
+        if dropped:
+            self.dropped_subscribers += 1
+        self.selector.unregister(sub.sock)
+        sub.sock.close()
+
+    def close(self, drain_timeout=1.0):
+        """Give subscribers up to drain_timeout seconds to receive what is queued, then stop"""
+        deadline = time.monotonic() + drain_timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not any(sub.queue or sub.pending for sub in self.subscribers.values()):
+                    break
+            time.sleep(self.poll_interval)
+        self._stop = True
+        self.thread.join()
+        for sub in list(self.subscribers.values()):
+            self._remove(sub)
+        self.selector.close()
+        self.listener.close()
+        if self.listener.family == socket.AF_UNIX:
+            path = parse_address(self.address)[1]
+            if is_socket(path):
+                os.unlink(path)
+
+
+class SimulationPublisher:
+    def __init__(self, sim, server, interval=1.0, packets=True):
+        """Simulator listener that streams packet events and, every interval
+        wall-clock seconds, a snapshot of stats, connection states and
+        throughput"""
+        self.sim = sim
+        self.server = server
+        self.interval = interval
+        self.packets = packets
+        self._next_snapshot = time.monotonic() + interval
+        self._last_time = sim.now
+        self._last_bytes = sim.stats["bytes_delivered"]
+
+    def __call__(self, event, conn_id, direction, packet, sent_at, at):
+        if self.packets and self.server.subscribers:
+            seq = packet.seq_num
+            self.server.publish_line((PACKET_EVENT % (
+                event, at, conn_id, direction, packet.packet_type,
+                "null" if seq is None else seq, "true" if packet.is_corrupt else "false"
+            )).encode())
+        if time.monotonic() >= self._next_snapshot:
+            self.snapshot()
+
+    def snapshot(self, final=False):
+        """Publish the current counters (also call once at the end of a run)"""
+        self._next_snapshot = time.monotonic() + self.interval
+        if not self.server.subscribers:
+            return
+        sim = self.sim
+        elapsed = sim.now - self._last_time
+        delivered = sim.stats["bytes_delivered"] - self._last_bytes
+        self._last_time = sim.now
+        self._last_bytes = sim.stats["bytes_delivered"]
+        self.server.publish({
+            "type": "snapshot",
+            "t": sim.now,
+            "final": final,
+            "stats": dict(sim.stats),
+            "states": sim.state_counts(),
+            "events_processed": sim.events_processed,
+            "throughput_Bps": delivered / elapsed if elapsed > 0 else 0.0
+        }, droppable=False)
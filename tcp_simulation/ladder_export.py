@@ -0,0 +1,154 @@
+# ladder_export.py
+# Streams client/server ladder (sequence) diagrams of simulated connections to SVG
+
+import os
+from xml.sax.saxutils import escape
+from constants import PACKET_COLORS, DATA, PROBE
+
+WIDTH = 640
+CLIENT_X = 140
+SERVER_X = 500
+TOP = 70
+BOTTOM_MARGIN = 40
+HEADER_DIGITS = 10  # Height is patched into the header once the run is over
+
+
+class LadderDiagram:
+    def __init__(self, path, conn_id=0, title=None, px_per_second=400.0, stagger=6.0):
+        """Simulator listener that writes one connection's packets to an SVG file.
+
+        Each packet is written as soon as it is delivered or dropped, so memory
+        use does not grow with the number of packets. Packets sent at the same
+        instant are staggered by `stagger` pixels so a window stays readable.
+        """
+        self.path = path
+        self.conn_id = conn_id
+        self.px_per_second = px_per_second
+        self.stagger = stagger
+        self.max_y = TOP
+        self.end_time = 0.0
+        self.packets = 0
+        self._last_send = None
+        self._stack = 0
+        self._sent_data = set()
+
+        self.file = open(path, "w", encoding="utf-8", buffering=1 << 16)
+        self._write_header(0)
+        title = escape(title or f"Connection {conn_id}")
+        self.file.write(
+            '<style>text{font-family:Arial,sans-serif;font-size:9px}'
+            '.lane{stroke:#444;stroke-width:2}.tick{fill:#888}.bad{stroke-dasharray:4 3}</style>\n'
+            '<rect width="100%" height="100%" fill="white"/>\n'
+            f'<text x="{WIDTH / 2}" y="20" text-anchor="middle" style="font-size:13px">{title}</text>\n'
+            f'<text x="{CLIENT_X}" y="45" text-anchor="middle" style="font-size:11px">Client</text>\n'
+            f'<text x="{SERVER_X}" y="45" text-anchor="middle" style="font-size:11px">Server</text>\n'
+            f'<line class="lane" x1="{CLIENT_X}" y1="{TOP - 10}" x2="{CLIENT_X}" y2="100%"/>\n'
+            f'<line class="lane" x1="{SERVER_X}" y1="{TOP - 10}" x2="{SERVER_X}" y2="100%"/>\n'
+        )
+
+    def _write_header(self, height):
+        self.file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" '
+            f'height="{height:0{HEADER_DIGITS}d}" viewBox="0 0 {WIDTH} {height:0{HEADER_DIGITS}d}">\n'
+        )
+
+    def _y(self, t):
+        return TOP + t * self.px_per_second
+
+    def __call__(self, event, conn_id, direction, packet, sent_at, at):
+        if conn_id != self.conn_id or event == "send":
+            return
+
+        # Stagger packets that left the same side at the same instant
+        key = (direction, sent_at)
+        self._stack = self._stack + 1 if key == self._last_send else 0
+        self._last_send = key
+        offset = self._stack * self.stagger
+
+        if direction == "client_to_server":
+            x1, x2, anchor, label_x = CLIENT_X, SERVER_X, "end", CLIENT_X - 6
+        else:
+            x1, x2, anchor, label_x = SERVER_X, CLIENT_X, "start", SERVER_X + 6
+        y1 = self._y(sent_at) + offset
+        color = PACKET_COLORS.get(packet.packet_type, "black")
+
+        label = str(packet)
+        if packet.packet_type == DATA:
+            if packet.seq_num in self._sent_data:
+                label += " resend"
+            self._sent_data.add(packet.seq_num)
+        elif packet.data and packet.packet_type != PROBE and len(str(packet.data)) <= 24:
+            label += f" {packet.data}"
+        if packet.is_corrupt:
+            label += " corrupt"
+        css = ' class="bad"' if packet.is_corrupt else ""
+
+        if event == "drop":
+            # Lost on the link: a short stub ending in a cross
+            xm = (x1 + x2) / 2
+            y2 = y1 + (self._y(sent_at + 0.02) - self._y(sent_at))
+            self.file.write(
+                f'<line x1="{x1}" y1="{y1:.1f}" x2="{xm}" y2="{y2:.1f}" stroke="{color}"{css}/>'
+                f'<path d="M{xm - 4} {y2 - 4:.1f}l8 8m0 -8l-8 8" stroke="red" stroke-width="2"/>'
+                f'<text x="{label_x}" y="{y1 + 3:.1f}" text-anchor="{anchor}" fill="red">'
+                f'{escape(label)} lost</text>\n'
+            )
+        else:
+            y2 = self._y(at) + offset
+            self.file.write(
+                f'<line x1="{x1}" y1="{y1:.1f}" x2="{x2}" y2="{y2:.1f}" stroke="{color}"{css}/>'
+                f'<text x="{label_x}" y="{y1 + 3:.1f}" text-anchor="{anchor}" fill="{color}">'
+                f'{escape(label)}</text>\n'
+            )
+        self.max_y = max(self.max_y, y1, y2)
+        self.end_time = max(self.end_time, at)
+        self.packets += 1
+
+    def close(self):
+        """Write the time axis, then patch the final height into the header"""
+        step = 1.0
+        while step * self.px_per_second < 40:
+            step *= 2
+        t = 0.0
+        while t <= self.end_time + step:
+            y = self._y(t)
+            self.file.write(f'<text class="tick" x="8" y="{y + 3:.1f}">{t:g}s</text>\n')
+            t += step
+        self.file.write("</svg>\n")
+
+        height = int(max(self.max_y, self._y(t - step))) + BOTTOM_MARGIN
+        self.file.seek(0)
+        self._write_header(height)
+        self.file.close()
+        return self.path
+
+
+def attach_ladders(sim, directory, conn_ids, **options):
+    """Add a LadderDiagram listener for each connection in conn_ids"""
+    os.makedirs(directory, exist_ok=True)
+    diagrams = []
+    for conn_id in conn_ids:
+        diagram = LadderDiagram(os.path.join(directory, f"ladder_{conn_id}.svg"), conn_id, **options)
+        sim.add_listener(diagram)
+        diagrams.append(diagram)
+    return diagrams
+
+
+def export_sweep(directory, runs, num_packets=20, window_size=4, **options):
+    """Simulate one connection per entry of runs (Simulator keyword dicts) and
+    write a diagram for each; returns the file paths"""
+    from simulator import Simulator
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for params in runs:
+        name = "_".join(f"{key}-{value}" for key, value in sorted(params.items())) or "default"
+        sim = Simulator(**params)
+        sim.add_connection(num_packets, window_size)
+        diagram = LadderDiagram(os.path.join(directory, f"ladder_{name}.svg"),
+                                title=", ".join(f"{k}={v}" for k, v in sorted(params.items())),
+                                **options)
+        sim.add_listener(diagram)
+        sim.run()
+        paths.append(diagram.close())
+    return paths
@@ -0,0 +1,130 @@
+# load_balancer.py
+# A load-balancer node in front of a server pool, and the scenario runner that
+# compares balancing policies
+
+import bisect
+import hashlib
+import math
+import random
+from simulator import Simulator
+from topology import Topology
+
+POLICIES = ("round-robin", "least-connections", "consistent-hash")
+
+
+class LoadBalancer:
+    def __init__(self, servers, policy="round-robin", node="lb", replicas=100):
+        """Assigns each new connection to one of servers when its first packet
+        reaches node; the choice sticks for the life of the connection"""
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        self.servers = list(servers)
+        self.policy = policy
+        self.node = node
+        self.active = dict.fromkeys(self.servers, 0)    # Open connections per server
+        self.assigned = dict.fromkeys(self.servers, 0)  # All connections ever sent there
+        self._seen = set()
+        self._open = set()
+        self._next = 0
+
+        # Consistent hashing: `replicas` points per server on a 64-bit ring
+        self._ring = sorted(
+            (self._hash(f"{server}#{i}"), server) for server in self.servers for i in range(replicas)
+        ) if policy == "consistent-hash" else []
+        self._ring_keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def pick(self, conn):
+        """Server for a new connection under the configured policy"""
+        if self.policy == "round-robin":
+            server = self.servers[self._next]
+            self._next = (self._next + 1) % len(self.servers)
+            return server
+        if self.policy == "least-connections":
+            return min(self.servers, key=self.active.__getitem__)  # Ties: pool order
+        # Hash the client host, so a client keeps landing on the same server
+        i = bisect.bisect(self._ring_keys, self._hash(conn.client_node)) % len(self._ring)
+        return self._ring[i][1]
+
+    def server_for(self, conn):
+        """The connection's server, chosen on first use"""
+        if conn.server_node is None:
+            conn.server_node = self.pick(conn)
+        if conn.conn_id not in self._seen:
+            self._seen.add(conn.conn_id)
+            self._open.add(conn.conn_id)
+            self.active[conn.server_node] += 1
+            self.assigned[conn.server_node] += 1
+        return conn.server_node
+
+    def release(self, conn):
+        """A connection finished or failed"""
+        if conn.conn_id in self._open:
+            self._open.discard(conn.conn_id)
+            self.active[conn.server_node] -= 1
+
+
+def balanced_topology(num_clients, server_rates, delay=0.01, queue_limit=32, node="lb"):
+    """Clients on uncongested access links to the balancer node; server i sits
+    behind a link of server_rates[i] packets/s (its serving capacity)"""
+    topo = Topology(f"balanced:{num_clients}x{len(server_rates)}")
+    topo.add_node(node)
+    for i in range(num_clients):
+        topo.add_host(f"c{i}", "client")
+        topo.connect(f"c{i}", node, delay)
+    for i, rate in enumerate(server_rates):
+        topo.add_host(f"s{i}", "server")
+        topo.connect(f"s{i}", node, delay, rate, queue_limit)
+    return topo
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list (None when empty)"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100.0 * len(values)) - 1)]
+
+
+def run_balanced(policy, num_connections=200, server_rates=(400, 200, 200, 100), num_clients=16,
+                 num_packets=20, window_size=4, arrival_rate=20.0, queue_limit=32, seed=0,
+                 **sim_options):
+    """Open num_connections (Poisson arrivals) through a balancer and report
+    per-server connection counts and completion-time percentiles"""
+    topology = balanced_topology(num_clients, server_rates, queue_limit=queue_limit)
+    balancer = LoadBalancer(topology.servers, policy)
+    sim = Simulator(seed=seed, topology=topology, balancer=balancer, **sim_options)
+
+    # Arrival times come from their own generator so every policy sees the same load
+    arrivals = random.Random(seed)
+    start = 0.0
+    for _ in range(num_connections):
+        start += arrivals.expovariate(arrival_rate)
+        sim.add_connection(num_packets, window_size, start_time=start)
+    sim.run()
+
+    durations = {server: [] for server in topology.servers}
+    for conn in sim.connections:
+        if conn.completion_time is not None:
+            durations[conn.server_node].append(conn.completion_time - conn.start_time)
+
+    def distribution(values):
+        values.sort()
+        return {
+            "completed": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else None
+        }
+
+    servers = {}
+    for server, rate in zip(topology.servers, server_rates):
+        servers[server] = {"rate": rate, "connections": balancer.assigned[server]}
+        servers[server].update(distribution(durations[server]))
+    overall = distribution([d for values in durations.values() for d in values])
+    overall["failed"] = sim.stats["connections_failed"]
+    overall["queue_drops"] = sim.stats["queue_drops"]
+    return {"policy": policy, "servers": servers, "overall": overall}
@@ -6,6 +6,7 @@ from event_manager import EventManager
 from client_ui import ClientUI
 from server_ui import ServerUI
 from network_ui import NetworkUI
+from chart_ui import ChartUI
 from animation_manager import AnimationManager
 from connection_manager import ConnectionManager
 
@@ -13,7 +14,7 @@ class TCPApp:
     def __init__(self, root):
         self.root = root
         self.root.title("TCP Protocol Simulation")
-        self.root.geometry("1000x600")
+        self.root.geometry("1280x600")
 
         # Setup shared event manager
         self.event_manager = EventManager()
@@ -25,6 +26,7 @@ class TCPApp:
         # UI Components
         self.client_ui = ClientUI(main_frame, self.event_manager)
         self.network_ui = NetworkUI(main_frame, self.event_manager)
+        self.chart_ui = ChartUI(main_frame, self.event_manager)
         self.server_ui = ServerUI(main_frame, self.event_manager)
 
         # Logic/animation manager
@@ -36,8 +38,9 @@ class TCPApp:
             self.animation_manager, self.event_manager, self.network_ui
         )
 
-        # Start animation thread
-        self.animation_manager.start_animation_thread()
+        # Start the animation frame scheduler
+        self.animation_manager.start()
+        self.chart_ui.start()
 
         # Start event polling loop
         self.schedule_event_processing()
@@ -51,7 +54,10 @@ class TCPApp:
             print(f"Error in event processing: {e}")
             self.root.after(10, self.schedule_event_processing)
 
-if __name__ == "__main__":
+def main():
     root = tk.Tk()
     app = TCPApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
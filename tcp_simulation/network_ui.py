@@ -2,6 +2,7 @@
 # Handles the network visualization UI
 
 import tkinter as tk
+from constants import FAST_FORWARD_FACTORS
 
 class NetworkUI:
     def __init__(self, parent_frame, event_manager):
@@ -32,16 +33,64 @@ class NetworkUI:
         # Pause/Resume button
         self.pause_button = tk.Button(self.frame, text="Pause", command=self.on_toggle_pause)
         self.pause_button.pack(pady=5)
+
+        # Fast-forward: run the protocol without drawing, resync on return to Off
+        ff_frame = tk.Frame(self.frame)
+        ff_frame.pack(fill=tk.X, pady=5)
+        tk.Label(ff_frame, text="Fast-forward:").pack(side=tk.LEFT)
+        self.fast_forward_var = tk.StringVar(value=FAST_FORWARD_FACTORS[0][0])
+        tk.OptionMenu(ff_frame, self.fast_forward_var, *(label for label, _ in FAST_FORWARD_FACTORS),
+                      command=self.on_fast_forward).pack(side=tk.LEFT)
+
+        # Packet capture to a pcap file
+        self.capture_button = tk.Button(self.frame, text="Start pcap capture", command=self.on_toggle_capture)
+        self.capture_button.pack(pady=5)
+        self.capturing = False
+
+        # Frame scheduler telemetry
+        self.frame_stats_var = tk.StringVar(value="FPS: -")
+        tk.Label(self.frame, textvariable=self.frame_stats_var, font=("Arial", 8)).pack()
     
     def on_toggle_pause(self):
         """Handle pause button click"""
         paused = self.event_manager.toggle_pause()
         self.pause_button.config(text="Resume" if paused else "Pause")
     
+    def on_fast_forward(self, label):
+        """Handle a fast-forward selection"""
+        factor = dict(FAST_FORWARD_FACTORS)[label]
+        was_active = bool(self.event_manager.fast_forward)
+        self.event_manager.fast_forward = factor
+        if bool(factor) != was_active and hasattr(self, 'fast_forward_handler'):
+            self.fast_forward_handler(bool(factor))
+
+    def on_toggle_capture(self):
+        """Handle capture button click: ask for a file, or stop the running capture"""
+        if not hasattr(self, 'capture_handler'):
+            return
+        if self.capturing:
+            self.capture_handler(None)
+            self.capturing = False
+        else:
+            from tkinter import filedialog
+            path = filedialog.asksaveasfilename(defaultextension=".pcap",
+                                                filetypes=[("pcap files", "*.pcap")])
+            if not path:
+                return
+            self.capture_handler(path)
+            self.capturing = True
+        self.capture_button.config(text="Stop pcap capture" if self.capturing else "Start pcap capture")
+
     def get_simulation_speed(self):
         """Get the current simulation speed"""
         return self.speed_var.get()
     
+    def show_frame_stats(self, fps, overruns, skipped, sim_time):
+        """Display animation frame rate, budget overruns and skipped frames"""
+        self.frame_stats_var.set(
+            f"FPS: {fps:.1f}  Overruns: {overruns}  Skipped: {skipped}  t={sim_time:.1f}s"
+        )
+
     def create_packet_animation(self, packet, direction):
         """Create a new packet animation on the canvas"""
         # This will be implemented by the animation manager
@@ -12,3 +12,10 @@ class Packet:
         if self.seq_num is not None:
             return f"{self.packet_type}({self.seq_num})"
         return self.packet_type
+
+    def __getstate__(self):
+        # Payload views into a mapped file cannot be pickled; checkpoints copy them
+        state = self.__dict__.copy()
+        if isinstance(self.data, memoryview):
+            state["data"] = self.data.tobytes()
+        return state
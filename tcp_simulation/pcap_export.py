@@ -0,0 +1,225 @@
+# pcap_export.py
+# Streams simulated packets to a pcap file with synthesized IPv4/TCP headers
+
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from constants import SYN, SYN_ACK, ACK, DATA, NACK, FIN, FIN_ACK, CLOSED, PROBE, DEFAULT_MSS
+
+LINKTYPE_RAW = 101  # Records start at the IPv4 header
+PCAP_HEADER = struct.Struct("<IHHiIII")
+RECORD_HEADER = struct.Struct("<IIII")
+IP_HEADER = struct.Struct("!BBHHHBBHII")
+TCP_HEADER = struct.Struct("!HHIIBBHHH")
+PSEUDO_HEADER = struct.Struct("!IIBBH")
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+TCP_FLAGS = {
+    SYN: TCP_SYN,
+    SYN_ACK: TCP_SYN | TCP_ACK,
+    ACK: TCP_ACK,
+    DATA: TCP_PSH | TCP_ACK,
+    NACK: TCP_PSH | TCP_ACK,  # TCP has no NACK: the list travels as payload
+    FIN: TCP_FIN | TCP_ACK,
+    FIN_ACK: TCP_FIN | TCP_ACK,
+    CLOSED: TCP_RST | TCP_ACK,
+    PROBE: TCP_ACK
+}
+
+CLIENT_ISN = 1000
+SERVER_ISN = 500000
+SERVER_PORT = 8080
+SERVER_ADDRESS = (10 << 24) | (2 << 16) | 1  # 10.2.0.1
+MAX_PAYLOAD = 65535 - 40  # IPv4 total length is 16 bits and includes both headers
+CLOSED_KEPT = 1024  # Closed connections remembered for late FIN+ACK retransmissions
+
+
+def internet_checksum(data):
+    """RFC 1071 one's-complement checksum"""
+    if len(data) % 2:
+        data = bytes(data) + b"\0"
+    total = sum(array("H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    if sys.byteorder == "little":
+        total = ((total & 0xFF) << 8) | (total >> 8)
+    return ~total & 0xFFFF
+
+
+class PcapWriter:
+    def __init__(self, path, mss=DEFAULT_MSS, epoch=None, buffer_size=1 << 20):
+        """Packet listener (Simulator or EventManager) writing every sent packet
+        to a pcap file as IPv4/TCP.
+
+        Records go to an in-memory buffer that is written out whenever it
+        passes buffer_size, so memory stays constant however long the run and
+        the file is complete as soon as close() returns. Timestamps are epoch
+        (default: now) plus the simulated send time. Connection n is the
+        client 10.1.x.y:(40000 + n) talking to 10.2.0.1:8080. DATA sequence
+        numbers advance by the payload length, each segment starting where the
+        previous one ended; a resend repeats the original sequence number and
+        length. FINs consume a sequence number, and corrupt packets carry a
+        deliberately wrong TCP checksum. A connection's state is dropped once
+        its final ACK is written; only the last CLOSED_KEPT closed connections
+        are remembered, to number retransmitted FINs. mss converts window
+        annotations to bytes and may not exceed MAX_PAYLOAD.
+        """
+        if not 0 < mss <= MAX_PAYLOAD:
+            raise ValueError(f"MSS must be between 1 and {MAX_PAYLOAD} bytes to fit in an IPv4 packet, not {mss}")
+        self.path = path
+        self.mss = mss
+        self.epoch = int(time.time()) if epoch is None else epoch
+        self.buffer_size = buffer_size
+        self.packets = 0
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._server_next = {}  # conn_id -> server sequence offset after its last DATA
+        self._segments = {}     # conn_id -> [lowest unacked seq, {seq: (offset, length)}]
+        self._fins = set()      # (conn_id, direction) whose FIN has been sent
+        self._closed = OrderedDict()  # conn_id -> server offset, for connections past their final ACK
+        self._ip_id = 0
+        self.file = open(path, "wb")
+        self._write(PCAP_HEADER.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_RAW))
+
+    def _write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self._buffer)
+        self.bytes_written += len(self._buffer)
+        self._buffer.clear()
+
+    def __call__(self, event, conn_id, direction, packet, sent_at, at):
+        if event == "send":
+            self.write_packet(at, conn_id or 0, direction, packet)
+
+    def write_packet(self, t, conn_id, direction, packet):
+        ptype = packet.packet_type
+        client = (10 << 24) | (1 << 16) | ((conn_id + 1) & 0xFFFF)
+        client_port = 40000 + conn_id % 25000
+        data = packet.data
+
+        if ptype == DATA:
+            payload = data.encode() if isinstance(data, str) else (data if data is not None else b"")
+        elif data is not None and ptype != PROBE:
+            payload = str(data).encode()
+        else:
+            payload = b""
+
+        # Receive window from RWND:/WINDOW: annotations, in bytes
+        window = 65535
+        if isinstance(data, str) and data[:5] in ("RWND:", "WINDO"):
+            try:
+                window = min(65535, int(data.split(":", 1)[1].split(";")[0]) * self.mss)
+            except ValueError:
+                pass
+
+        seq_num = packet.seq_num or 0
+        flags = TCP_FLAGS.get(ptype, TCP_ACK)
+        fin = flags & TCP_FIN
+        if conn_id in self._closed:
+            if fin:
+                self._reopen(conn_id)  # A FIN resent because the final ACK was lost
+            elif ptype == SYN:
+                del self._closed[conn_id]  # The id starts a new connection
+        # A FIN takes one sequence number; only its retransmissions reuse it
+        client_fin = 1 if (conn_id, "client_to_server") in self._fins else 0
+        server_fin = 1 if (conn_id, "server_to_client") in self._fins else 0
+        if direction == "client_to_server":
+            src, dst, sport, dport = client, SERVER_ADDRESS, client_port, SERVER_PORT
+            seq = CLIENT_ISN if ptype == SYN else CLIENT_ISN + 1 + (client_fin and not fin)
+            if ptype == ACK and packet.seq_num is not None:
+                ack = SERVER_ISN + 1 + self._acked_offset(conn_id, seq_num)
+            else:
+                ack = SERVER_ISN + 1 + self._server_next.get(conn_id, 0) + server_fin
+        else:
+            src, dst, sport, dport = SERVER_ADDRESS, client, SERVER_PORT, client_port
+            if ptype == DATA:
+                offset, length = self._place_segment(conn_id, seq_num, len(payload))
+                if length != len(payload):
+                    payload = bytes(payload[:length]).ljust(length, b"\0")
+                seq = SERVER_ISN + 1 + offset
+            elif ptype == SYN_ACK:
+                seq = SERVER_ISN
+            else:
+                seq = SERVER_ISN + 1 + self._server_next.get(conn_id, 0) + (server_fin and not fin)
+            ack = CLIENT_ISN + 1 + client_fin
+        if fin:
+            self._fins.add((conn_id, direction))
+            self._segments.pop(conn_id, None)  # No DATA follows a FIN
+        elif ptype == ACK and client_fin and server_fin:
+            self._forget(conn_id)  # Final ACK: nothing but FIN retransmissions can follow
+        if flags == TCP_SYN:
+            ack = 0
+        seq &= 0xFFFFFFFF
+        ack &= 0xFFFFFFFF
+
+        # Headers are packed once with zero checksums to compute them, then again
+        tcp_length = 20 + len(payload)
+        check = internet_checksum(b"".join((
+            PSEUDO_HEADER.pack(src, dst, 0, 6, tcp_length),
+            TCP_HEADER.pack(sport, dport, seq, ack, 5 << 4, flags, window, 0, 0),
+            payload
+        )))
+        if packet.is_corrupt:
+            check ^= 0xFFFF
+        self._ip_id = (self._ip_id + 1) & 0xFFFF
+        total_length = 20 + tcp_length
+        ip_check = internet_checksum(
+            IP_HEADER.pack(0x45, 0, total_length, self._ip_id, 0x4000, 64, 6, 0, src, dst))
+
+        seconds, micros = divmod(round(t * 1e6), 1000000)
+        buffer = self._buffer
+        buffer += RECORD_HEADER.pack(self.epoch + seconds, micros, total_length, total_length)
+        buffer += IP_HEADER.pack(0x45, 0, total_length, self._ip_id, 0x4000, 64, 6, ip_check, src, dst)
+        buffer += TCP_HEADER.pack(sport, dport, seq, ack, 5 << 4, flags, window, check, 0)
+        buffer += payload
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+        self.packets += 1
+
+    def _place_segment(self, conn_id, seq_num, length):
+        """(offset, length) of DATA segment seq_num: a first send starts where
+        the stream sent so far ends, a resend keeps its original place and size"""
+        segments = self._segments.setdefault(conn_id, [1, {}])
+        span = segments[1].get(seq_num)
+        if span is None:
+            offset = self._server_next.get(conn_id, 0)
+            span = segments[1][seq_num] = (offset, length)
+            self._server_next[conn_id] = offset + length
+        return span
+
+    def _acked_offset(self, conn_id, seq_num):
+        """Stream offset just past DATA segment seq_num, for a cumulative ACK;
+        the segments below it cannot be resent any more and are forgotten"""
+        if seq_num <= 0:
+            return 0
+        segments = self._segments.get(conn_id)
+        span = segments and segments[1].get(seq_num)
+        if not span:
+            return self._server_next.get(conn_id, 0)
+        for acked in range(segments[0], seq_num):
+            segments[1].pop(acked, None)
+        segments[0] = max(segments[0], seq_num)
+        return span[0] + span[1]
+
+    def _forget(self, conn_id):
+        self._closed[conn_id] = self._server_next.pop(conn_id, 0)
+        if len(self._closed) > CLOSED_KEPT:
+            self._closed.popitem(last=False)
+        self._fins.discard((conn_id, "client_to_server"))
+        self._fins.discard((conn_id, "server_to_client"))
+
+    def _reopen(self, conn_id):
+        self._server_next[conn_id] = self._closed.pop(conn_id)
+        self._fins.add((conn_id, "client_to_server"))
+        self._fins.add((conn_id, "server_to_client"))
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        return self.path
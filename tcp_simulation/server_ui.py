@@ -2,6 +2,7 @@
 # Handles the server side of the UI
 
 import tkinter as tk
+from event_manager import DeferredLog
 from constants import DISCONNECTED
 
 class ServerUI:
@@ -12,6 +13,9 @@ class ServerUI:
         
         # State variables
         self.state = DISCONNECTED
+
+        # Log lines and status changes held back while fast-forwarding
+        self.deferred = DeferredLog(event_manager, self.write_log)
         
         # Initialize UI components
         self.setup_ui()
@@ -45,6 +49,9 @@ class ServerUI:
     
     def update_status(self):
         """Update the status display based on current state"""
+        if self.deferred.defer_status():
+            return
+
         def _update():
             self.status_label.config(text=self.state)
             if self.state == DISCONNECTED:
@@ -58,14 +65,21 @@ class ServerUI:
     
     def log_message(self, message):
         """Add message to the server log"""
-        def _log():
-            self.log.insert(tk.END, f"{message}\n")
-            self.log.see(tk.END)
-        
-        self.event_manager.queue_event(_log)
+        self.deferred.add(message)
+
+    def write_log(self, text):
+        """Append text to the log widget (Tk thread only)"""
+        self.log.insert(tk.END, text)
+        self.log.see(tk.END)
+    
+    def flush_deferred(self):
+        """Write the log lines and status held back during fast-forward in one batch"""
+        if self.deferred.flush():
+            self.update_status()
     
     def clear_log(self):
-        """Clear the log contents"""
+        """Clear the log contents, including lines held back by fast-forward"""
+        self.deferred.clear()
         def _clear():
             self.log.delete(1.0, tk.END)
         
@@ -0,0 +1,161 @@
+# sharded_simulation.py
+# Splits many simulated connections across worker processes with shared-memory counters
+
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from simulator import Simulator, STAT_FIELDS, CONNECTION_STATES
+
+# Layout of one worker row: simulator stats, client state counts, bookkeeping
+COUNTER_FIELDS = STAT_FIELDS + tuple(f"state_{s}" for s in CONNECTION_STATES) + (
+    "events_processed",
+    "sim_time_us",
+    "done"
+)
+# Rows are padded to a 64-byte cache line so workers never share one
+ROW_STRIDE = (len(COUNTER_FIELDS) + 7) // 8 * 8
+ITEM_SIZE = 8
+
+
+class SharedCounters:
+    def __init__(self, num_workers, name=None):
+        """Create a counter block, or attach to an existing one when name is given"""
+        self.num_workers = num_workers
+        size = num_workers * ROW_STRIDE * ITEM_SIZE
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.values = self.shm.buf.cast("q")
+        if self.owner:
+            for i in range(len(self.values)):
+                self.values[i] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, worker, sim):
+        """Copy a simulator's counters into this worker's row (single writer, no lock)"""
+        base = worker * ROW_STRIDE
+        values = self.values
+        i = base
+        for field in STAT_FIELDS:
+            values[i] = sim.stats[field]
+            i += 1
+        counts = sim.state_counts()
+        for state in CONNECTION_STATES:
+            values[i] = counts.get(state, 0)
+            i += 1
+        values[i] = sim.events_processed
+        values[i + 1] = int(sim.now * 1e6)
+
+    def mark_done(self, worker):
+        self.values[worker * ROW_STRIDE + COUNTER_FIELDS.index("done")] = 1
+
+    def row(self, worker):
+        """Counters of one worker as a dict"""
+        base = worker * ROW_STRIDE
+        return {field: self.values[base + i] for i, field in enumerate(COUNTER_FIELDS)}
+
+    def totals(self):
+        """Counters summed over all workers (sim_time_us is the maximum)"""
+        totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        for worker in range(self.num_workers):
+            for field, value in self.row(worker).items():
+                if field == "sim_time_us":
+                    totals[field] = max(totals[field], value)
+                else:
+                    totals[field] += value
+        return totals
+
+    def close(self):
+        self.values.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(shm_name, num_workers, worker, num_connections, num_packets,
+                 window_size, error_rate, loss_rate, link_delay, seed, publish_interval):
+    """Run one shard of connections and publish its counters periodically"""
+    counters = SharedCounters(num_workers, name=shm_name)
+    try:
+        sim = Simulator(seed=None if seed is None else seed + worker,
+                        link_delay=link_delay, error_rate=error_rate, loss_rate=loss_rate)
+        for i in range(num_connections):
+            # Stagger connection starts so shards are not perfectly synchronised
+            sim.add_connection(num_packets, window_size, start_time=i * link_delay / 10)
+
+        while not sim.finished:
+            sim.run(until=sim.now + publish_interval)
+            counters.publish(worker, sim)
+        counters.publish(worker, sim)
+        counters.mark_done(worker)
+    finally:
+        counters.close()
+
+
+def run_sharded(num_connections, workers=None, num_packets=5, window_size=3,
+                error_rate=0.1, loss_rate=0.0, link_delay=0.05, seed=0, publish_interval=1.0,
+                poll_interval=0.1, on_update=None):
+    """Simulate num_connections split across worker processes and return the totals.
+
+    on_update, if given, is called with the current totals every poll_interval
+    seconds; it reads shared memory directly and never blocks the workers.
+    Raises RuntimeError if any worker exits before finishing its shard.
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, num_connections))
+    counters = SharedCounters(workers)
+
+    ctx = multiprocessing.get_context()
+    processes = []
+    start = time.perf_counter()
+    try:
+        for worker in range(workers):
+            share = num_connections // workers + (1 if worker < num_connections % workers else 0)
+            process = ctx.Process(
+                target=_worker_main,
+                args=(counters.name, workers, worker, share, num_packets, window_size,
+                      error_rate, loss_rate, link_delay, seed, publish_interval),
+                daemon=True
+            )
+            process.start()
+            processes.append(process)
+
+        while any(p.is_alive() for p in processes):
+            if on_update:
+                on_update(counters.totals())
+            time.sleep(poll_interval)
+        for process in processes:
+            process.join()
+
+        elapsed = time.perf_counter() - start
+        totals = counters.totals()
+        # A shard that raised leaves its row partial; its totals are not a result
+        failed = [worker for worker, process in enumerate(processes)
+                  if process.exitcode != 0 or not counters.row(worker)["done"]]
+        if failed:
+            codes = ", ".join(f"{worker} (exit code {processes[worker].exitcode})" for worker in failed)
+            raise RuntimeError(f"{len(failed)} of {workers} shards failed: worker {codes}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        counters.close()
+
+    totals["workers"] = workers
+    totals["elapsed"] = elapsed
+    totals["packets_per_second"] = totals["packets_sent"] / elapsed if elapsed > 0 else 0.0
+    return totals
+
+
+if __name__ == "__main__":
+    for count in (1, 2, 4):
+        result = run_sharded(4000, workers=count, num_packets=20, window_size=5)
+        print(f"workers={count}  {result['packets_per_second']:10.0f} pkt/s  "
+              f"completed={result['connections_completed']}")
@@ -0,0 +1,846 @@
+# simulator.py
+# Headless discrete-event engine running the same protocol as ConnectionManager
+
+import heapq
+import random
+from constants import *
+from packet_model import Packet
+from timer_wheel import TimerWheel
+from byte_stream import ReassemblyBuffer
+
+# Counters every simulator keeps (order matters for shared-memory publishing)
+STAT_FIELDS = (
+    "packets_sent",
+    "packets_lost",
+    "bytes_delivered",
+    "retransmissions",
+    "corrupt_packets",
+    "timeouts",
+    "zero_window_events",
+    "window_probes",
+    "control_packets",
+    "queue_drops",
+    "connections_completed",
+    "connections_failed"
+)
+
+CONNECTION_STATES = (DISCONNECTED, CONNECTING, CONNECTED, CLOSING, TIME_WAIT)
+
+# Acknowledgement schemes: "nack" is the per-window ACK/NACK exchange; "sack"
+# uses a sliding window with delayed cumulative ACKs that carry SACK ranges and
+# corrupt-segment reports, so no separate NACK is needed (the GUI's scheme)
+ACK_MODES = ("nack", "sack")
+MAX_SACK_BLOCKS = 4
+
+
+class SimConnection:
+    def __init__(self, sim, conn_id, num_packets, window_size, auto_close=True,
+                 source=None, output_path=None):
+        self.sim = sim
+        self.conn_id = conn_id
+        self.num_packets = num_packets
+        self.window_size = window_size
+        self.auto_close = auto_close
+
+        # Optional real byte stream: the server segments source, the client
+        # reassembles into sink and checks the hash at the end
+        self.source = source
+        self.output_path = output_path
+        self.sink = None
+        self.verified = None
+        if source is not None:
+            self.num_packets = source.num_segments
+
+        self.client_state = DISCONNECTED
+        self.server_state = DISCONNECTED
+
+        # Client side: packets of the current window, keyed by sequence number
+        self.received_packets = {}
+        self.expected_seq = 1
+        self.data_seen = False
+
+        # Receive buffer drained by the application at sim.read_rate packets/s;
+        # advertised is the free space announced in the last ACK
+        self.buffer_capacity = window_size
+        self.buffered = 0
+        self.advertised = window_size
+        self.reader_active = False
+        self.transfer_done = False
+
+        # SACK mode: segments received since the last ACK, corrupt ones to
+        # report, and the delayed-ACK timer (both modes use it for held ACKs)
+        self.unacked_segments = 0
+        self.bad_segments = []
+        self.ack_timer = None
+        self.ack_held = False
+        self.report_pending = False
+        self.right_edge = window_size
+
+        # Server side: window in flight and the receiver's last advertised window
+        self.transfer_started = False
+        self.window_start = 1
+        self.window_end = 0
+        self.peer_window = window_size
+        self.persisting = False
+        self.persist_probes = 0
+        self.unanswered_probes = 0
+
+        # SACK mode: segments the client holds out of order, and holes
+        # already retransmitted since the last cumulative advance
+        self.sacked = set()
+        self.retransmitted = set()
+
+        # One retransmission timer per side, plus retry counts for backoff
+        self.client_timer = None
+        self.server_timer = None
+        self.client_retries = 0
+        self.server_retries = 0
+
+        self.start_time = None
+        self.completion_time = None
+        self.closed_time = None
+
+    # Timers
+
+    def arm_client_timer(self, delay, callback):
+        self.sim.cancel_timer(self.client_timer)
+        self.client_timer = self.sim.set_timer(delay * 2 ** self.client_retries, callback)
+
+    def arm_server_timer(self, delay, callback):
+        self.sim.cancel_timer(self.server_timer)
+        self.server_timer = self.sim.set_timer(delay * 2 ** self.server_retries, callback)
+
+    def client_gives_up(self):
+        """Count a client timeout; abort the connection after too many retries"""
+        self.sim.stats["timeouts"] += 1
+        self.client_retries += 1
+        if self.client_retries <= self.sim.max_retries:
+            return False
+        self.client_state = DISCONNECTED
+        self.connection_done(completed=False)
+        return True
+
+    def server_gives_up(self):
+        """Count a server timeout; drop the connection after too many retries"""
+        self.sim.stats["timeouts"] += 1
+        self.server_retries += 1
+        if self.server_retries <= self.sim.max_retries:
+            return False
+        self.server_state = DISCONNECTED
+        return True
+
+    def connection_done(self, completed):
+        """Count the outcome; a load balancer stops counting the connection"""
+        self.sim.stats["connections_completed" if completed else "connections_failed"] += 1
+        self.close_sink()
+        if self.sim.balancer is not None:
+            self.sim.balancer.release(self)
+
+    # Client side
+
+    def open(self):
+        """Client sends SYN (start of the three-way handshake)"""
+        if self.client_state != DISCONNECTED:
+            return
+        self.start_time = self.sim.now
+        self.client_state = CONNECTING
+        self.send_syn()
+
+    def send_syn(self):
+        self.send_from_client(Packet(SYN))
+        self.arm_client_timer(self.sim.syn_timeout, self.on_syn_timeout)
+
+    def on_syn_timeout(self):
+        if self.client_state == CONNECTING and not self.client_gives_up():
+            self.send_syn()
+
+    def send_window_request(self):
+        self.send_from_client(Packet(ACK, 0, f"WINDOW:{self.window_size}"))
+        self.arm_client_timer(self.sim.rto, self.on_request_timeout)
+
+    def on_request_timeout(self):
+        if self.client_state == CONNECTED and not self.data_seen and not self.client_gives_up():
+            self.send_window_request()
+
+    def on_idle_timeout(self):
+        if self.client_state == CONNECTED:
+            self.sim.stats["timeouts"] += 1
+            self.client_state = DISCONNECTED
+            self.connection_done(completed=False)
+
+    def close(self):
+        """Client sends FIN once the transfer is finished"""
+        if self.client_state != CONNECTED:
+            return
+        self.client_state = CLOSING
+        self.client_retries = 0
+        self.send_fin()
+
+    def send_fin(self):
+        self.send_from_client(Packet(FIN))
+        self.arm_client_timer(self.sim.rto, self.on_fin_timeout)
+
+    def on_fin_timeout(self):
+        if self.client_state == CLOSING and not self.client_gives_up():
+            self.send_fin()
+
+    def on_time_wait_expired(self):
+        if self.client_state == TIME_WAIT:
+            self.client_state = DISCONNECTED
+            self.closed_time = self.sim.now
+
+    def client_receive(self, packet):
+        """Handle a packet arriving at the client"""
+        ptype = packet.packet_type
+        if ptype == SYN_ACK and self.client_state == CONNECTING:
+            self.client_state = CONNECTED
+            self.client_retries = 0
+            self.send_from_client(Packet(ACK))
+            if self.source is not None:
+                self.sink = ReassemblyBuffer(self.source.size, self.source.mss, self.output_path)
+            if self.num_packets == 0:
+                self.finish_transfer()
+            else:
+                self.send_window_request()
+        elif ptype == DATA and self.client_state == CONNECTED:
+            self.data_seen = True
+            self.reset_idle_timer()
+            if self.sim.ack_mode == "sack":
+                self.client_receive_data_sack(packet)
+            else:
+                self.client_receive_data(packet)
+        elif ptype == PROBE and self.client_state == CONNECTED:
+            self.reset_idle_timer()
+            self.send_ack()
+        elif ptype == DATA and self.client_state in (CLOSING, TIME_WAIT):
+            # Our last ACK was lost and the server is retransmitting
+            self.send_from_client(Packet(ACK, self.expected_seq - 1))
+        elif ptype == FIN_ACK and self.client_state == CLOSING:
+            self.sim.cancel_timer(self.client_timer)
+            self.send_from_client(Packet(ACK))
+            self.client_state = TIME_WAIT
+            self.completion_time = self.sim.now
+            self.connection_done(completed=True)
+            self.client_timer = self.sim.set_timer(self.sim.time_wait, self.on_time_wait_expired)
+        elif ptype == FIN_ACK and self.client_state == TIME_WAIT:
+            # Final ACK was lost; TIME_WAIT exists to answer the repeated FIN+ACK
+            self.send_from_client(Packet(ACK))
+
+    def reset_idle_timer(self):
+        # Idle timer: give up if the server falls silent mid-transfer
+        self.sim.cancel_timer(self.client_timer)
+        self.client_timer = self.sim.set_timer(self.sim.idle_timeout, self.on_idle_timeout)
+
+    def free_space(self):
+        return max(0, self.buffer_capacity - self.buffered)
+
+    def receive_window(self):
+        """Free space worth advertising. Silly-window avoidance: less than
+        half the buffer is announced as zero, so the sender is never handed
+        a sliver of window to fill with a tiny burst."""
+        free = self.free_space()
+        return free if free >= max(1, self.buffer_capacity // 2) else 0
+
+    def window_short(self):
+        """True when an ACK now would advertise less than the whole buffer
+        although the reader will empty it within the delayed-ACK time; such
+        an ACK is held until the buffer is empty so the window reopens whole.
+        Slower readers get their ACK at once (a zero window if less than half
+        the buffer is free) and a window update once half is free."""
+        return (bool(self.buffered) and self.expected_seq <= self.num_packets
+                and self.buffered < self.sim.read_rate * self.sim.delayed_ack)
+
+    def hold_ack(self):
+        self.ack_held = True
+        if self.ack_timer is None:
+            self.ack_timer = self.sim.set_timer(self.sim.delayed_ack, self.on_delayed_ack)
+
+    def send_ack(self):
+        """Cumulative ACK advertising the receive window.
+
+        A non-zero advertisement is a commitment: the server may already be
+        sending that window, so it is repeated unchanged until the window is
+        complete. Only a zero window is re-evaluated (window updates, probes),
+        and a held ACK is sized when it finally goes out.
+        """
+        if self.sim.ack_mode == "sack":
+            self.send_sack()
+            return
+        if self.ack_held:
+            self.ack_held = False
+            self.sim.cancel_timer(self.ack_timer)
+            self.ack_timer = None
+            self.advertised = self.receive_window()
+        elif self.advertised == 0 and not self.received_packets:
+            self.advertised = self.receive_window()
+        self.send_from_client(Packet(ACK, self.expected_seq - 1, f"RWND:{self.advertised}"))
+
+    def send_sack(self):
+        """Cumulative ACK with free space, SACK ranges and corrupt segments.
+
+        The right edge (cumulative ACK + window) never moves left, even when
+        silly-window avoidance rounds the free space down to zero.
+        """
+        self.sim.cancel_timer(self.ack_timer)
+        self.ack_timer = None
+        self.ack_held = False
+        self.unacked_segments = 0
+        self.advertised = max(self.receive_window(), self.right_edge - self.expected_seq + 1)
+        self.right_edge = self.expected_seq - 1 + self.advertised
+        fields = [f"RWND:{self.advertised}"]
+
+        if self.received_packets:
+            blocks = []
+            for seq in sorted(self.received_packets):
+                if blocks and blocks[-1][1] == seq - 1:
+                    blocks[-1][1] = seq
+                elif len(blocks) < MAX_SACK_BLOCKS:
+                    blocks.append([seq, seq])
+                else:
+                    break
+            fields.append("SACK:" + ",".join(f"{a}-{b}" for a, b in blocks))
+        if self.bad_segments:
+            fields.append("BAD:" + ",".join(map(str, self.bad_segments)))
+            self.bad_segments = []
+        self.send_from_client(Packet(ACK, self.expected_seq - 1, ";".join(fields)))
+
+    def client_receive_data_sack(self, packet):
+        """Sliding-window receive: take segments in order, hold the rest, ACK lazily"""
+        seq = packet.seq_num
+        if seq < self.expected_seq or seq in self.received_packets:
+            self.send_sack()  # Duplicate: our ACK was lost, repeat it now
+            return
+        if seq - self.expected_seq >= self.free_space():
+            return  # Outside the advertised window
+
+        # A corrupt segment, or one arriving past a new hole, is reported at once
+        urgent = packet.is_corrupt or (seq > self.expected_seq and seq - 1 not in self.received_packets)
+        if packet.is_corrupt:
+            self.bad_segments.append(seq)
+        else:
+            self.received_packets[seq] = packet
+            if self.sink is not None:
+                self.sink.write(seq, packet.data)
+            while self.expected_seq in self.received_packets:
+                in_order = self.received_packets.pop(self.expected_seq)
+                self.sim.stats["bytes_delivered"] += len(in_order.data)
+                if self.sim.read_rate:
+                    self.buffered += 1
+                self.expected_seq += 1
+
+        # ACK now if the sender must be stalled (window filled, or all data
+        # in) or after every ack_every segments; report damage as soon as the
+        # burst it arrived in is over; otherwise wait for the timer. An ACK
+        # that would shrink the window only until the reader catches up is held.
+        self.unacked_segments += 1
+        self.start_reader()
+        ack_every = self.sim.ack_every
+        if (self.expected_seq > min(self.right_edge, self.num_packets)
+                or (ack_every and self.unacked_segments >= ack_every)):
+            if self.window_short():
+                self.hold_ack()
+            else:
+                self.send_sack()
+        elif urgent:
+            if not self.report_pending:
+                # Segments sent together arrive at the same instant: one SACK
+                # after all of them covers every hole and corrupt segment
+                self.report_pending = True
+                self.sim.schedule(0.0, self.send_report)
+        elif self.ack_timer is None:
+            self.ack_timer = self.sim.set_timer(self.sim.delayed_ack, self.on_delayed_ack)
+
+        if self.expected_seq > self.num_packets and not self.buffered:
+            self.finish_transfer()
+
+    def send_report(self):
+        self.report_pending = False
+        if self.client_state == CONNECTED and self.unacked_segments and not self.ack_held:
+            if self.window_short():
+                self.hold_ack()
+            else:
+                self.send_sack()
+
+    def on_delayed_ack(self):
+        self.ack_timer = None
+        if self.client_state == CONNECTED and (self.unacked_segments or self.ack_held):
+            self.send_ack()
+
+    def client_receive_data(self, packet):
+        """Store a DATA packet and acknowledge the window once it is complete"""
+        if packet.seq_num < self.expected_seq:
+            self.send_ack()
+            return
+        window_end = min(self.expected_seq + self.advertised - 1, self.num_packets)
+        if packet.seq_num > window_end:
+            return
+        if packet.seq_num not in self.received_packets:
+            self.received_packets[packet.seq_num] = packet
+            if self.sink is not None and not packet.is_corrupt:
+                self.sink.write(packet.seq_num, packet.data)
+
+        if len(self.received_packets) < window_end - self.expected_seq + 1:
+            return
+
+        corrupt = [seq for seq, p in sorted(self.received_packets.items()) if p.is_corrupt]
+        if corrupt:
+            for seq in corrupt:
+                del self.received_packets[seq]
+            self.send_from_client(Packet(NACK, self.expected_seq, f"NACK:{','.join(map(str, corrupt))}"))
+            return
+
+        for p in self.received_packets.values():
+            self.sim.stats["bytes_delivered"] += len(p.data)
+        if self.sim.read_rate:
+            self.buffered += len(self.received_packets)
+        self.received_packets = {}
+        self.expected_seq = window_end + 1
+        self.start_reader()
+        if self.window_short():
+            self.hold_ack()
+        else:
+            self.ack_held = True  # The window is complete: size the next one now
+            self.send_ack()
+
+        if self.expected_seq > self.num_packets and not self.buffered:
+            self.finish_transfer()
+
+    def start_reader(self):
+        """Let the application start draining the receive buffer"""
+        if self.buffered and not self.reader_active:
+            self.reader_active = True
+            self.sim.schedule(1.0 / self.sim.read_rate, self.app_read)
+
+    def app_read(self):
+        """The application consumes one packet from the receive buffer"""
+        self.buffered -= 1
+        if self.client_state == CONNECTED:
+            if self.ack_held:
+                if not self.buffered:
+                    self.send_ack()  # Buffer empty: reopen the whole window
+            elif self.advertised == 0 and self.receive_window():
+                # Window update: the sender is blocked on a zero window
+                self.send_ack()
+        if self.buffered:
+            self.sim.schedule(1.0 / self.sim.read_rate, self.app_read)
+            return
+        self.reader_active = False
+        if self.expected_seq > self.num_packets:
+            self.finish_transfer()
+
+    def finish_transfer(self):
+        """All data is in: verify the reassembled stream, then close"""
+        if self.transfer_done:
+            return
+        self.transfer_done = True
+        if self.sink is not None:
+            self.verified = self.sink.digest() == self.source.digest()
+            self.close_sink()
+        if self.auto_close:
+            self.close()
+
+    def close_sink(self):
+        """Release the reassembly buffer (and its mapping) once the transfer is over"""
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def send_from_client(self, packet):
+        self.sim.transmit(packet, self.server_receive, self.conn_id, "client_to_server")
+
+    # Server side
+
+    def server_receive(self, packet):
+        """Handle a packet arriving at the server"""
+        ptype = packet.packet_type
+        if ptype == SYN and self.server_state in (DISCONNECTED, CONNECTING):
+            self.server_state = CONNECTING
+            self.send_syn_ack()
+        elif ptype == ACK and packet.data and str(packet.data).startswith("WINDOW:"):
+            if self.server_state == CONNECTING:
+                self.server_state = CONNECTED  # Handshake ACK was lost
+            if self.server_state == CONNECTED and not self.transfer_started:
+                self.transfer_started = True
+                self.window_size = int(packet.data.split(":")[1])
+                self.peer_window = self.window_size
+                if self.sim.ack_mode == "sack":
+                    self.fill_window()
+                else:
+                    self.send_window()
+        elif ptype == ACK and self.server_state == CONNECTING:
+            self.server_state = CONNECTED
+            self.arm_idle_timer()
+        elif ptype == ACK and self.server_state == CONNECTED and packet.seq_num is not None:
+            self.unanswered_probes = 0
+            if self.sim.ack_mode == "sack":
+                self.server_receive_sack(packet)
+                return
+            if packet.data and str(packet.data).startswith("RWND:"):
+                self.peer_window = int(packet.data.split(":")[1])
+            if packet.seq_num >= self.window_end >= self.window_start:
+                self.server_retries = 0
+                self.window_start = packet.seq_num + 1
+                self.send_window()
+            elif self.persisting and self.peer_window > 0:
+                self.send_window()  # Window update reopened the window
+        elif ptype == NACK and self.server_state == CONNECTED:
+            corrupt = [int(s) for s in packet.data.split(":")[1].split(",") if s]
+            for seq in corrupt:
+                if self.window_start <= seq <= self.window_end:
+                    self.sim.stats["retransmissions"] += 1
+                    self.send_from_server(Packet(DATA, seq, self.payload(seq, resend=True)))
+            self.arm_server_timer(self.sim.rto, self.on_retransmission_timeout)
+        elif ptype == FIN and self.server_state in (CONNECTED, CLOSING):
+            self.server_state = CLOSING
+            self.send_from_server(Packet(FIN_ACK))
+            self.arm_server_timer(self.sim.rto, self.on_last_ack_timeout)
+        elif ptype == ACK and self.server_state == CLOSING and packet.seq_num is None:
+            self.sim.cancel_timer(self.server_timer)
+            self.server_state = DISCONNECTED
+
+    def payload(self, seq, resend=False):
+        """Bytes carried by DATA packet seq: a zero-copy segment of the source if any"""
+        if self.source is not None:
+            return self.source.segment(seq)
+        return f"Data packet {seq} (resend)" if resend else f"Data packet {seq}"
+
+    def send_syn_ack(self):
+        self.send_from_server(Packet(SYN_ACK))
+        self.arm_server_timer(self.sim.syn_timeout, self.on_syn_ack_timeout)
+
+    def on_syn_ack_timeout(self):
+        if self.server_state == CONNECTING and not self.server_gives_up():
+            self.send_syn_ack()
+
+    def arm_idle_timer(self):
+        self.sim.cancel_timer(self.server_timer)
+        self.server_timer = self.sim.set_timer(self.sim.idle_timeout, self.on_server_idle)
+
+    def on_server_idle(self):
+        if self.server_state == CONNECTED:
+            self.sim.stats["timeouts"] += 1
+            self.server_state = DISCONNECTED
+
+    def send_window(self):
+        """Send the next window of DATA packets, corrupting each at the error rate"""
+        if self.window_start > self.num_packets:
+            self.persisting = False
+            self.arm_idle_timer()  # Transfer done, wait for FIN
+            return
+        if self.peer_window <= 0:
+            # Zero window: wait for an update, probing in case it gets lost
+            if not self.persisting:
+                self.persisting = True
+                self.persist_probes = 0
+                self.sim.stats["zero_window_events"] += 1
+            self.arm_persist_timer()
+            return
+        self.persisting = False
+        self.window_end = min(self.window_start + self.peer_window - 1, self.num_packets)
+        for seq in range(self.window_start, self.window_end + 1):
+            packet = Packet(DATA, seq, self.payload(seq))
+            if self.sim.rng.random() < self.sim.error_rate:
+                packet.is_corrupt = True
+                self.sim.stats["corrupt_packets"] += 1
+            self.send_from_server(packet)
+        self.arm_server_timer(self.sim.rto, self.on_retransmission_timeout)
+
+    def server_receive_sack(self, packet):
+        """Advance on the cumulative ACK, repair reported holes, then refill the window"""
+        cumulative = packet.seq_num
+        if cumulative < self.window_start - 1:
+            return  # Stale ACK
+        fields = dict(field.split(":", 1) for field in str(packet.data or "").split(";") if ":" in field)
+
+        if cumulative >= self.window_start:
+            self.window_start = cumulative + 1
+            self.server_retries = 0
+            self.retransmitted = {seq for seq in self.retransmitted if seq > cumulative}
+            self.sim.cancel_timer(self.server_timer)
+        if "RWND" in fields:
+            self.peer_window = int(fields["RWND"])
+
+        self.sacked = set()
+        for block in filter(None, fields.get("SACK", "").split(",")):
+            first, last = map(int, block.split("-"))
+            self.sacked.update(range(first, last + 1))
+
+        # Corrupt segments are resent at once; unreported gaps below the
+        # highest SACKed segment were lost on the link
+        repair = [int(seq) for seq in filter(None, fields.get("BAD", "").split(","))]
+        if self.sacked:
+            repair.extend(seq for seq in range(self.window_start, max(self.sacked))
+                          if seq not in self.retransmitted)
+        for seq in sorted(set(repair)):
+            if seq >= self.window_start and seq not in self.sacked:
+                self.retransmit(seq)
+
+        self.fill_window()
+
+    def retransmit(self, seq):
+        self.retransmitted.add(seq)
+        self.sim.stats["retransmissions"] += 1
+        self.send_from_server(Packet(DATA, seq, self.payload(seq, resend=True)))
+
+    def fill_window(self):
+        """SACK mode: send new segments up to the receiver's right edge"""
+        if self.window_start > self.num_packets:
+            self.persisting = False
+            self.arm_idle_timer()  # Transfer done, wait for FIN
+            return
+        right_edge = min(self.window_start - 1 + self.peer_window, self.num_packets)
+        while self.window_end < right_edge:
+            self.window_end += 1
+            packet = Packet(DATA, self.window_end, self.payload(self.window_end))
+            if self.sim.rng.random() < self.sim.error_rate:
+                packet.is_corrupt = True
+                self.sim.stats["corrupt_packets"] += 1
+            self.send_from_server(packet)
+
+        if self.window_end >= self.window_start:
+            self.persisting = False
+            timer = self.server_timer
+            if timer is None or not timer.pending or timer.callback != self.on_retransmission_timeout:
+                self.arm_server_timer(self.sim.rto, self.on_retransmission_timeout)
+        elif self.peer_window <= 0:
+            if not self.persisting:
+                self.persisting = True
+                self.persist_probes = 0
+                self.sim.stats["zero_window_events"] += 1
+            self.arm_persist_timer()
+
+    def arm_persist_timer(self):
+        self.sim.cancel_timer(self.server_timer)
+        delay = self.sim.rto * 2 ** min(self.persist_probes, 6)
+        self.server_timer = self.sim.set_timer(delay, self.on_persist_timeout)
+
+    def on_persist_timeout(self):
+        """Send a zero-window probe so a lost window update cannot stall us forever"""
+        if self.server_state != CONNECTED or not self.persisting:
+            return
+        if self.unanswered_probes > self.sim.max_retries:
+            self.sim.stats["timeouts"] += 1
+            self.server_state = DISCONNECTED
+            return
+        self.unanswered_probes += 1
+        self.persist_probes += 1
+        self.sim.stats["window_probes"] += 1
+        self.send_from_server(Packet(PROBE, self.window_start - 1))
+        self.arm_persist_timer()
+
+    def on_retransmission_timeout(self):
+        """Nothing acknowledged the window in time: resend all of it"""
+        if self.server_state != CONNECTED or self.window_start > self.num_packets:
+            return
+        if self.server_gives_up():
+            return
+        for seq in range(self.window_start, self.window_end + 1):
+            if seq in self.sacked:
+                continue
+            self.sim.stats["retransmissions"] += 1
+            self.send_from_server(Packet(DATA, seq, self.payload(seq, resend=True)))
+        self.arm_server_timer(self.sim.rto, self.on_retransmission_timeout)
+
+    def on_last_ack_timeout(self):
+        if self.server_state == CLOSING and not self.server_gives_up():
+            self.send_from_server(Packet(FIN_ACK))
+            self.arm_server_timer(self.sim.rto, self.on_last_ack_timeout)
+
+    def send_from_server(self, packet):
+        self.sim.transmit(packet, self.client_receive, self.conn_id, "server_to_client")
+
+
+class Simulator:
+    def __init__(self, seed=None, link_delay=0.05, error_rate=0.1, loss_rate=0.0,
+                 syn_timeout=1.0, rto=1.0, time_wait=TIME_WAIT_DURATION, max_retries=5,
+                 read_rate=None, ack_mode="nack", delayed_ack=0.1, ack_every=0, topology=None,
+                 balancer=None):
+        if ack_mode not in ACK_MODES:
+            raise ValueError(f"ack_mode must be one of {ACK_MODES}, not {ack_mode!r}")
+        self.now = 0.0
+        self.rng = random.Random(seed)
+        self.link_delay = link_delay
+        self.error_rate = error_rate
+        self.loss_rate = loss_rate
+        self.syn_timeout = syn_timeout
+        self.rto = rto
+        self.time_wait = time_wait
+        self.max_retries = max_retries
+        self.read_rate = read_rate  # Application reads per second (None: instant)
+        self.ack_mode = ack_mode
+        self.delayed_ack = delayed_ack  # Delayed-ACK timer; also caps how long an ACK is held
+        self.ack_every = ack_every  # Also ACK every n segments (0: window end, damage and timer only)
+        self.topology = topology  # None: one direct link of link_delay
+        self.balancer = balancer  # Picks the server when a SYN reaches its node
+        if balancer is not None and topology is None:
+            raise ValueError("A load balancer needs a topology containing its node")
+        self.idle_timeout = rto * 2 ** (max_retries + 1)
+        self.stats = dict.fromkeys(STAT_FIELDS, 0)
+        self.connections = []
+        self.events_processed = 0
+
+        # Heap of (time, insertion order, callback, args) for packet arrivals
+        self._events = []
+        self._counter = 0
+
+        # Cancellable protocol timeouts (SYN, retransmission, delayed ACK, TIME_WAIT)
+        self.timers = TimerWheel(tick=0.001)
+
+        # Packet listeners: listener(event, conn_id, direction, packet, sent_at, at)
+        # with event "send", "deliver" or "drop"; not saved in checkpoints
+        self.listeners = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["listeners"] = []
+        return state
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, event, conn_id, direction, packet, sent_at):
+        for listener in self.listeners:
+            listener(event, conn_id, direction, packet, sent_at, self.now)
+
+    def schedule(self, delay, callback, *args):
+        """Run callback(*args) after delay simulated seconds"""
+        heapq.heappush(self._events, (self.now + delay, self._counter, callback, args))
+        self._counter += 1
+
+    def set_timer(self, delay, callback, *args):
+        """Start a cancellable timer; returns its handle"""
+        return self.timers.schedule_at(self.now + delay, callback, *args)
+
+    def cancel_timer(self, timer):
+        self.timers.cancel(timer)
+
+    def transmit(self, packet, handler, conn_id=None, direction=None):
+        """Send a packet across the link; handler(packet) runs when it arrives"""
+        self.stats["packets_sent"] += 1
+        if packet.packet_type != DATA:
+            self.stats["control_packets"] += 1
+        if self.listeners:
+            self.notify("send", conn_id, direction, packet, self.now)
+        if self.loss_rate and self.rng.random() < self.loss_rate:
+            self.stats["packets_lost"] += 1
+            if self.listeners:
+                self.notify("drop", conn_id, direction, packet, self.now)
+            return
+        if self.topology is not None:
+            conn = self.connections[conn_id]
+            if direction == "client_to_server":
+                # Until the balancer has picked a server, packets are addressed to it
+                dst = conn.server_node or self.balancer.node
+                self.forward(conn.client_node, dst, handler, packet, conn_id, direction, self.now)
+            else:
+                self.forward(conn.server_node, conn.client_node, handler, packet, conn_id, direction, self.now)
+        elif self.listeners:
+            self.schedule(self.link_delay, self.deliver, handler, packet, conn_id, direction, self.now)
+        else:
+            self.schedule(self.link_delay, handler, packet)
+
+    def forward(self, node, dst, handler, packet, conn_id, direction, sent_at):
+        """Queue a packet on node's link towards dst; runs again at each router"""
+        if node == dst:
+            # Arrived at the load balancer, which forwards to the connection's server
+            dst = self.balancer.server_for(self.connections[conn_id])
+        link = self.topology.next_link(node, dst)
+        arrival = link.enqueue(self.now)
+        if arrival is None:
+            self.stats["packets_lost"] += 1
+            self.stats["queue_drops"] += 1
+            if self.listeners:
+                self.notify("drop", conn_id, direction, packet, sent_at)
+            return
+        if link.dst != dst or (self.balancer is not None and dst == self.balancer.node):
+            self.schedule(arrival - self.now, self.forward, link.dst, dst, handler, packet,
+                          conn_id, direction, sent_at)
+        elif self.listeners:
+            self.schedule(arrival - self.now, self.deliver, handler, packet, conn_id, direction, sent_at)
+        else:
+            self.schedule(arrival - self.now, handler, packet)
+
+    def deliver(self, handler, packet, conn_id, direction, sent_at):
+        """Arrival of a packet sent while listeners were attached"""
+        if self.listeners:
+            self.notify("deliver", conn_id, direction, packet, sent_at)
+        handler(packet)
+
+    def add_connection(self, num_packets, window_size, start_time=0.0, auto_close=True,
+                       source=None, output_path=None, client=None, server=None):
+        """Create a connection whose client opens at start_time.
+
+        With a topology, client and server name its hosts; by default
+        connections are spread round-robin over the topology's clients and
+        servers, or the load balancer picks the server when the SYN reaches it.
+        """
+        conn = SimConnection(self, len(self.connections), num_packets, window_size, auto_close,
+                             source=source, output_path=output_path)
+        if self.topology is not None:
+            conn.client_node = client or self.topology.clients[conn.conn_id % len(self.topology.clients)]
+            if self.balancer is not None:
+                conn.server_node = server  # Normally left to the balancer
+            else:
+                conn.server_node = server or self.topology.servers[conn.conn_id % len(self.topology.servers)]
+        self.connections.append(conn)
+        self.schedule(max(0.0, start_time - self.now), conn.open)
+        return conn
+
+    def add_transfer(self, source, window_size, output_path=None, start_time=0.0):
+        """Create a connection that transfers the bytes of a ByteStreamSource"""
+        return self.add_connection(0, window_size, start_time,
+                                   source=source, output_path=output_path)
+
+    def run(self, until=None, max_events=None):
+        """Process events and due timers in time order; returns the number processed.
+
+        events_processed is kept current during the run, so listeners see it grow.
+        """
+        processed = 0
+        events = self._events
+        timers = self.timers
+        while events or len(timers):
+            if max_events is not None and processed >= max_events:
+                break
+            next_event = events[0][0] if events else None
+
+            if len(timers):
+                horizon = next_event if next_event is not None else timers.next_expiry()
+                if until is not None and horizon > until:
+                    horizon = until
+                batch = timers.expired(horizon, first_batch_only=True)
+                if batch:
+                    for timer in batch:
+                        if not timer.cancelled:
+                            self.now = max(self.now, timer.expires)
+                            timer.callback(*timer.args)
+                    processed += 1
+                    self.events_processed += 1
+                    continue
+
+            if next_event is None or (until is not None and next_event > until):
+                break
+            when, _, callback, args = heapq.heappop(events)
+            self.now = when
+            callback(*args)
+            processed += 1
+            self.events_processed += 1
+
+        if until is not None and self.now < until and (events or len(timers)):
+            self.now = until
+        return processed
+
+    @property
+    def finished(self):
+        """True once no events or timers remain"""
+        return not self._events and not len(self.timers)
+
+    def state_counts(self):
+        """Number of connections in each client state"""
+        counts = dict.fromkeys(CONNECTION_STATES, 0)
+        for conn in self.connections:
+            counts[conn.client_state] = counts.get(conn.client_state, 0) + 1
+        return counts
@@ -0,0 +1,7 @@
+# conftest.py
+# Puts the simulation modules on the path so tests import them the way the app does
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+# test_byte_stream.py
+# Files sent through the simulator arrive byte for byte, whatever the link does
+
+import hashlib
+import mmap
+import os
+import pickle
+
+import pytest
+
+import byte_stream
+from byte_stream import ByteStreamSource, ReassemblyBuffer
+from simulator import Simulator
+
+
+def test_segments_cover_the_stream():
+    data = os.urandom(10_001)
+    with ByteStreamSource(data=data, mss=1000) as source:
+        assert source.num_segments == 11
+        sink = ReassemblyBuffer(source.size, source.mss)
+        for seq in reversed(range(1, source.num_segments + 1)):
+            sink.write(seq, source.segment(seq))
+        assert len(source.segment(11)) == 1
+        assert sink.digest() == source.digest() == hashlib.sha256(data).hexdigest()
+        sink.close()
+
+
+@pytest.mark.parametrize("ack_mode", ["nack", "sack"])
+@pytest.mark.parametrize("error_rate, loss_rate", [(0.0, 0.0), (0.2, 0.0), (0.0, 0.1), (0.15, 0.1)])
+def test_file_round_trip_under_loss_and_corruption(tmp_path, ack_mode, error_rate, loss_rate):
+    data = os.urandom(150_000)
+    path = tmp_path / "input.bin"
+    path.write_bytes(data)
+    output = tmp_path / "output.bin"
+
+    with ByteStreamSource(str(path), mss=1400) as source:
+        sim = Simulator(seed=5, error_rate=error_rate, loss_rate=loss_rate, ack_mode=ack_mode)
+        conn = sim.add_transfer(source, 16, output_path=str(output))
+        sim.run()
+
+    assert sim.stats["connections_completed"] == 1
+    assert conn.verified is True
+    if error_rate or loss_rate:
+        assert sim.stats["retransmissions"] > 0
+    assert hashlib.sha256(output.read_bytes()).hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+def test_empty_file_round_trip(tmp_path):
+    with ByteStreamSource(data=b"") as source:
+        sim = Simulator(seed=1)
+        conn = sim.add_transfer(source, 4, output_path=str(tmp_path / "empty.bin"))
+        sim.run()
+    assert conn.verified is True
+    assert (tmp_path / "empty.bin").read_bytes() == b""
+
+
+def test_large_sink_without_output_path_is_file_backed(monkeypatch):
+    monkeypatch.setattr(byte_stream, "IN_MEMORY_LIMIT", 4096)
+    data = os.urandom(20_000)
+    with ByteStreamSource(data=data, mss=1000) as source:
+        sim = Simulator(seed=2, error_rate=0.1)
+        conn = sim.add_transfer(source, 8)
+        sim.run(until=0.2)
+        sink = conn.sink
+        assert isinstance(sink._buffer, mmap.mmap)
+
+        # Checkpointing would copy the whole stream into memory
+        with pytest.raises(ValueError, match="without an output path"):
+            pickle.dumps(sim)
+        sim.run()
+    assert conn.verified is True
+    assert conn.sink is None and sink._buffer.closed
+
+
+def test_sink_is_closed_when_the_connection_fails():
+    with ByteStreamSource(data=os.urandom(50_000), mss=1000) as source:
+        sim = Simulator(seed=1, error_rate=0.0)
+        conn = sim.add_transfer(source, 8)
+        sim.run(until=0.3)
+        sink = conn.sink
+        assert sink is not None and conn.verified is None
+        sim.loss_rate = 1.0  # The link goes down mid-transfer
+        sim.run()
+    assert sim.stats["connections_failed"] == 1
+    assert conn.sink is None
+    with pytest.raises(ValueError):
+        sink.view.tobytes()  # Released by close()
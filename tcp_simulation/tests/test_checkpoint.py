@@ -0,0 +1,64 @@
+# test_checkpoint.py
+# A run stopped, saved and resumed ends exactly like one run straight through
+
+import pytest
+
+from checkpoint import FORMAT_VERSION, MAGIC, load_checkpoint, save_checkpoint
+from simulator import Simulator
+
+
+def scenario(ack_mode):
+    sim = Simulator(seed=11, error_rate=0.1, loss_rate=0.05, read_rate=200, ack_mode=ack_mode)
+    for i in range(25):
+        sim.add_connection(40, 6, start_time=i * 0.01)
+    return sim
+
+
+def outcome(sim):
+    return (dict(sim.stats), sim.now, sim.events_processed,
+            [(c.client_state, c.start_time, c.completion_time) for c in sim.connections])
+
+
+@pytest.mark.parametrize("ack_mode", ["nack", "sack"])
+def test_resume_is_deterministic(tmp_path, ack_mode):
+    straight = scenario(ack_mode)
+    straight.run()
+
+    path = tmp_path / "run.ckpt"
+    first = scenario(ack_mode)
+    first.run(until=1.5)
+    assert not first.finished
+    save_checkpoint(first, path)
+    first.run(until=3.0)
+    save_checkpoint(first, path)  # Overwrites the earlier checkpoint
+
+    resumed = load_checkpoint(path)
+    assert resumed.now == 3.0
+    resumed.run()
+    assert outcome(resumed) == outcome(straight)
+
+
+def test_transfer_resumes_into_the_same_bytes(tmp_path):
+    from byte_stream import ByteStreamSource
+    data = bytes(range(256)) * 200
+    source = ByteStreamSource(data=data, mss=500)
+    sim = Simulator(seed=2, error_rate=0.1, loss_rate=0.05)
+    sim.add_transfer(source, 8)
+    sim.run(until=1.0)
+    save_checkpoint(sim, tmp_path / "transfer.ckpt")
+
+    resumed = load_checkpoint(tmp_path / "transfer.ckpt")
+    resumed.run()
+    assert resumed.connections[0].verified is True
+
+
+def test_rejects_other_files_and_versions(tmp_path):
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError, match="not a simulation checkpoint"):
+        load_checkpoint(other)
+
+    newer = tmp_path / "newer.ckpt"
+    newer.write_bytes(MAGIC + bytes((FORMAT_VERSION + 1,)))
+    with pytest.raises(ValueError, match="Unsupported checkpoint version"):
+        load_checkpoint(newer)
@@ -0,0 +1,74 @@
+# test_cli.py
+# Headless entry point: argument handling, checkpoints and no Tk on import
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+
+
+def summary(output):
+    """Parse the "key: value" lines printed by print_summary"""
+    values = {}
+    for line in output.splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip() and " " not in key.strip():
+            values[key.strip()] = value.strip()
+    return values
+
+
+def test_import_does_not_load_tkinter():
+    code = ("import sys, cli; cli.main(['run', '--connections', '2', '--seed', '1']); "
+            "assert 'tkinter' not in sys.modules, 'tkinter imported'")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(cli.__file__))
+    assert result.returncode == 0, result.stderr
+
+
+def test_run_prints_a_summary(capsys):
+    assert cli.main(["run", "--connections", "3", "--packets", "4", "--seed", "2"]) == 0
+    values = summary(capsys.readouterr().out)
+    assert values["connections_completed"] == "3"
+    assert int(values["packets_sent"]) > 0
+
+
+@pytest.mark.parametrize("spec", ["ring:4", "chain:0", "dumbbell:x"])
+def test_bad_topology_is_rejected_at_parse_time(capsys, spec):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["run", "--topology", spec])
+    assert exit_info.value.code == 2
+    assert "--topology" in capsys.readouterr().err
+
+
+def test_resume_finishes_like_a_straight_run(tmp_path, capsys):
+    scenario = ["--connections", "10", "--packets", "8", "--error-rate", "20", "--seed", "3"]
+    assert cli.main(["run", *scenario]) == 0
+    straight = summary(capsys.readouterr().out)
+
+    path = str(tmp_path / "run.ckpt")
+    assert cli.main(["run", *scenario, "--until", "0.3", "--checkpoint", path]) == 0
+    partial = summary(capsys.readouterr().out)
+    assert int(partial["connections_completed"]) < 10
+    assert cli.main(["resume", path]) == 0
+    output = capsys.readouterr().out
+    assert "Resumed at simulated time 0.3" in output
+    resumed = summary(output)
+    for key in ("packets_sent", "retransmissions", "connections_completed", "simulated_time"):
+        assert resumed[key] == straight[key]
+
+
+def test_balance_reports_every_policy(capsys):
+    assert cli.main(["balance", "--connections", "12", "--server-rates", "100", "50",
+                     "--clients", "4", "--packets", "5", "--seed", "1"]) == 0
+    output = capsys.readouterr().out
+    for policy in ("round-robin", "least-connections", "consistent-hash"):
+        assert f"\n{policy}\n" in output
+    assert output.count("failed: 0") == 3
+
+
+def test_no_command_prints_help(capsys):
+    assert cli.main([]) == 1
+    assert "usage:" in capsys.readouterr().out
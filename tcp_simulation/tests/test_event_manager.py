@@ -0,0 +1,113 @@
+# test_event_manager.py
+# Log lines held back while fast-forwarding
+
+import threading
+
+from event_manager import EventManager, DeferredLog
+
+
+def drain(event_manager):
+    while not event_manager.event_queue.empty():
+        event_manager.process_events()
+
+
+def test_lines_are_held_during_fast_forward_and_flushed_in_order():
+    event_manager = EventManager()
+    written = []
+    log = DeferredLog(event_manager, written.append, max_lines=3)
+
+    log.add("before")
+    event_manager.fast_forward = 8
+    for i in range(5):
+        log.add(f"held {i}")
+    assert log.defer_status()
+    event_manager.fast_forward = 0
+    log.add("after switch, before flush")  # Still held so it cannot overtake older lines
+    assert log.flush()
+    log.add("after flush")
+    drain(event_manager)
+
+    assert written == [
+        "before\n",
+        "... 3 messages skipped during fast-forward\nheld 3\nheld 4\nafter switch, before flush\n",
+        "after flush\n"
+    ]
+    assert not log.flush()
+
+
+def test_clear_stops_holding_lines():
+    event_manager = EventManager()
+    written = []
+    log = DeferredLog(event_manager, written.append)
+
+    event_manager.fast_forward = 10
+    log.add("held")
+    assert log.defer_status()
+    event_manager.fast_forward = 0
+    log.clear()  # A reset before the flush
+    log.add("after reset")
+    assert not log.defer_status()
+    drain(event_manager)
+
+    assert written == ["after reset\n"]
+    assert not log.flush()
+
+
+def test_concurrent_logging_across_flushes_loses_nothing():
+    event_manager = EventManager()
+    written = []
+    log = DeferredLog(event_manager, written.append, max_lines=100000)
+    stop = threading.Event()
+    counts = [0, 0]
+
+    def writer(index):
+        while not stop.is_set():
+            log.add(f"{index}:{counts[index]}")
+            counts[index] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for _ in range(200):
+        event_manager.fast_forward = 4
+        event_manager.fast_forward = 0
+        log.flush()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    log.flush()
+    drain(event_manager)
+
+    lines = "".join(written).splitlines()
+    assert len(lines) == sum(counts)
+    for index in range(2):
+        mine = [int(line.split(":")[1]) for line in lines if line.startswith(f"{index}:")]
+        assert mine == list(range(counts[index]))
+
+
+def test_waits_time_out_on_the_timer_wheel():
+    event_manager = EventManager()
+    stop = threading.Event()
+
+    def pump():  # Stands in for the Tk loop, which fires due timers
+        while not stop.is_set():
+            event_manager.process_events()
+            stop.wait(0.005)
+
+    thread = threading.Thread(target=pump)
+    thread.start()
+    try:
+        assert not event_manager.wait_for_packet(timeout=0.05)
+        assert len(event_manager.timers) == 0  # Nothing left armed
+
+        event_manager.packet_received.set()
+        assert event_manager.wait_for_packet(timeout=5)
+        assert not event_manager.packet_received.is_set()
+
+        arrived = []
+        threading.Timer(0.05, lambda: (arrived.append(1), event_manager.packet_received.set())).start()
+        assert event_manager.wait_until(lambda: arrived, timeout=5)
+        assert len(event_manager.timers) == 0
+    finally:
+        stop.set()
+        thread.join()
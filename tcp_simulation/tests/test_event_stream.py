@@ -0,0 +1,104 @@
+# test_event_stream.py
+# Event stream server and simulation publisher, seen from a subscriber
+
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from event_stream import EventStreamServer, SimulationPublisher
+from simulator import Simulator
+
+
+def subscribe(server, path):
+    """Connect a subscriber and wait until the server has registered it"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    deadline = time.monotonic() + 5
+    while not server.subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.subscribers
+    return sock
+
+
+def read_all(sock, messages):
+    with sock, sock.makefile("r") as stream:
+        for line in stream:
+            messages.append(json.loads(line))
+
+
+def test_subscriber_sees_packets_and_live_snapshots(tmp_path):
+    path = str(tmp_path / "sim.sock")
+    server = EventStreamServer(f"unix:{path}", max_queue=100000)
+    messages = []
+    reader = threading.Thread(target=read_all, args=(subscribe(server, path), messages))
+    reader.start()
+
+    sim = Simulator(seed=2, error_rate=0.1)
+    for i in range(5):
+        sim.add_connection(20, 4, start_time=i * 0.01)
+    publisher = SimulationPublisher(sim, server, interval=0.0)
+    sim.add_listener(publisher)
+    sim.run()
+    publisher.snapshot(final=True)
+    server.close(drain_timeout=5)
+    reader.join(timeout=5)
+
+    assert messages[0]["type"] == "hello"
+    packets = [m for m in messages if m["type"] == "packet"]
+    assert {m["event"] for m in packets} >= {"send", "deliver"}
+    snapshots = [m for m in messages if m["type"] == "snapshot"]
+    counts = [m["events_processed"] for m in snapshots]
+    assert counts == sorted(counts) and counts[len(counts) // 2] > 0  # Counted during the run
+    final = messages[-1]
+    assert final["type"] == "snapshot" and final["final"]
+    assert final["events_processed"] == sim.events_processed
+    assert final["stats"]["connections_completed"] == 5
+
+
+def test_slow_subscriber_is_sampled_with_a_gap_report(tmp_path):
+    path = str(tmp_path / "sim.sock")
+    server = EventStreamServer(f"unix:{path}", max_queue=8, slow_policy="sample")
+    sock = subscribe(server, path)
+
+    # The subscriber does not read, so its socket buffer and then its queue fill up
+    total = 50000
+    for seq in range(total):
+        server.publish({"type": "packet", "seq": seq})
+    server.publish({"type": "snapshot", "final": True}, droppable=False)
+
+    messages = []
+    reader = threading.Thread(target=read_all, args=(sock, messages))
+    reader.start()
+    server.close(drain_timeout=5)
+    reader.join(timeout=5)
+
+    assert messages[0]["type"] == "hello"
+    assert messages[-1] == {"type": "snapshot", "final": True}
+    packets = [m["seq"] for m in messages if m["type"] == "packet"]
+    skipped = sum(m["skipped"] for m in messages if m["type"] == "gap")
+    assert skipped > 0
+    assert packets == sorted(packets)
+    assert len(packets) + skipped == total
+    assert server.dropped_subscribers == 0
+
+
+def test_listener_never_replaces_a_regular_file(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text("{}")
+    with pytest.raises(ValueError, match="not a socket"):
+        EventStreamServer(str(path))
+    assert path.read_text() == "{}"
+
+
+def test_stale_socket_is_replaced_and_removed_on_close(tmp_path):
+    path = str(tmp_path / "sim.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = EventStreamServer(path)
+    server.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,71 @@
+# test_ladder_export.py
+# Ladder diagrams are well-formed SVG showing every kind of packet
+
+import os
+import xml.etree.ElementTree as ET
+
+from ladder_export import BOTTOM_MARGIN, HEADER_DIGITS, attach_ladders, export_sweep
+from simulator import Simulator
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def parse(path):
+    root = ET.parse(path).getroot()
+    labels = [text.text for text in root.iter(f"{SVG}text")]
+    return root, labels
+
+
+def drawn_extent(root):
+    """Largest y of any line, or of any label's anchor (labels sit 3px below it)"""
+    ys = []
+    for line in root.iter(f"{SVG}line"):
+        ys += [float(line.get(a)) for a in ("y1", "y2") if not line.get(a).endswith("%")]
+    ys += [float(text.get("y")) - 3 for text in root.iter(f"{SVG}text")]
+    return max(ys)
+
+
+def check_height(path):
+    with open(path, encoding="utf-8") as f:
+        header = f.read(300)
+    root, _ = parse(path)
+    height = root.get("height")
+    assert len(height) == HEADER_DIGITS  # Zero-padded so patching never shifts the body
+    assert root.get("viewBox") == f"0 0 {root.get('width')} {height}"
+    assert f'height="{height}"' in header
+    assert int(height) == int(drawn_extent(root)) + BOTTOM_MARGIN
+
+
+def test_attached_diagrams_show_the_whole_exchange(tmp_path):
+    sim = Simulator(seed=4, error_rate=0.3)
+    for i in range(3):
+        sim.add_connection(12, 4, start_time=i * 0.01)
+    diagrams = attach_ladders(sim, str(tmp_path), range(2))
+    sim.run()
+    paths = [diagram.close() for diagram in diagrams]
+
+    assert sorted(os.listdir(tmp_path)) == ["ladder_0.svg", "ladder_1.svg"]
+    for path, diagram in zip(paths, diagrams):
+        root, labels = parse(path)
+        assert diagram.packets > 0
+        assert any(label.startswith("SYN(") or label == "SYN" for label in labels)
+        assert any(label.startswith("DATA(") for label in labels)
+        assert any(label.endswith("corrupt") for label in labels)
+        assert any(label.startswith("NACK") for label in labels)
+        assert any(label.startswith("DATA(") and "resend" in label for label in labels)
+        assert any(label.startswith("FIN") for label in labels)
+        check_height(path)
+
+
+def test_sweep_writes_one_diagram_per_run(tmp_path):
+    runs = [{"seed": 1, "error_rate": 0.0}, {"seed": 1, "error_rate": 0.3},
+            {"seed": 1, "error_rate": 0.3, "ack_mode": "sack"}]
+    paths = export_sweep(str(tmp_path), runs, num_packets=15, window_size=4)
+
+    assert len(paths) == len(set(paths)) == len(os.listdir(tmp_path)) == 3
+    for path, params in zip(paths, runs):
+        _, labels = parse(path)
+        assert any(label.startswith("SYN") for label in labels)
+        assert any(label.startswith("FIN") for label in labels)
+        assert any(label.endswith("corrupt") for label in labels) == (params["error_rate"] > 0)
+        check_height(path)
@@ -0,0 +1,84 @@
+# test_load_balancer.py
+# Balancing policies, alone and in a simulated server pool
+
+from types import SimpleNamespace
+
+import pytest
+
+from load_balancer import POLICIES, LoadBalancer, percentile, run_balanced
+
+SERVERS = ["s0", "s1", "s2"]
+
+
+def connection(conn_id, client="c0"):
+    return SimpleNamespace(conn_id=conn_id, client_node=client, server_node=None)
+
+
+def test_round_robin_cycles_through_the_pool():
+    balancer = LoadBalancer(SERVERS, "round-robin")
+    picked = [balancer.server_for(connection(i)) for i in range(7)]
+    assert picked == ["s0", "s1", "s2", "s0", "s1", "s2", "s0"]
+    assert balancer.assigned == {"s0": 3, "s1": 2, "s2": 2}
+
+
+def test_choice_sticks_and_is_counted_once():
+    balancer = LoadBalancer(SERVERS, "round-robin")
+    conn = connection(0)
+    assert {balancer.server_for(conn) for _ in range(5)} == {"s0"}
+    assert balancer.active["s0"] == balancer.assigned["s0"] == 1
+    balancer.release(conn)
+    balancer.release(conn)
+    assert balancer.active["s0"] == 0 and balancer.assigned["s0"] == 1
+
+
+def test_least_connections_fills_the_emptiest_server():
+    balancer = LoadBalancer(SERVERS, "least-connections")
+    conns = [connection(i) for i in range(3)]
+    assert [balancer.server_for(c) for c in conns] == SERVERS  # Ties go in pool order
+    balancer.release(conns[1])
+    assert balancer.server_for(connection(3)) == "s1"
+    balancer.release(conns[0])
+    balancer.release(conns[2])
+    assert balancer.server_for(connection(4)) == "s0"
+    assert balancer.active == {"s0": 1, "s1": 1, "s2": 0}
+
+
+def test_consistent_hash_keeps_clients_on_one_server():
+    balancer = LoadBalancer(SERVERS, "consistent-hash")
+    clients = [f"c{i}" for i in range(200)]
+    first = {client: balancer.server_for(connection(i, client)) for i, client in enumerate(clients)}
+    again = {client: balancer.server_for(connection(1000 + i, client)) for i, client in enumerate(clients)}
+    assert first == again
+    assert set(first.values()) == set(SERVERS)
+
+    # Losing a server moves only the clients that were on it
+    smaller = LoadBalancer(SERVERS[:2], "consistent-hash")
+    moved = [c for c in clients if smaller.server_for(connection(0, c)) != first[c]]
+    assert moved and all(first[c] == "s2" for c in moved)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="policy must be one of"):
+        LoadBalancer(SERVERS, "random")
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 11))
+    assert [percentile(values, q) for q in (0, 50, 90, 99, 100)] == [1, 5, 9, 10, 10]
+    assert percentile([], 50) is None
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_every_policy_serves_the_whole_load(policy):
+    report = run_balanced(policy, num_connections=60, num_clients=8, num_packets=10, seed=3,
+                          error_rate=0.0)
+    servers = report["servers"]
+    assert sum(s["connections"] for s in servers.values()) == 60
+    assert report["overall"]["completed"] + report["overall"]["failed"] == 60
+    assert report["overall"]["p50"] <= report["overall"]["p99"] <= report["overall"]["max"]
+
+
+def test_least_connections_favours_fast_servers():
+    report = run_balanced("least-connections", num_connections=150, seed=1, error_rate=0.0)
+    servers = report["servers"]
+    assert servers["s0"]["connections"] > servers["s3"]["connections"]  # 400 vs 100 packets/s
@@ -0,0 +1,128 @@
+# test_pcap_export.py
+# Captures parse as valid IPv4/TCP: checksums, lengths and sequence space
+
+import pytest
+
+from constants import ACK, DATA, FIN, FIN_ACK, SYN, SYN_ACK
+from packet_model import Packet
+from pcap_export import (IP_HEADER, MAX_PAYLOAD, PCAP_HEADER, PSEUDO_HEADER, RECORD_HEADER,
+                         TCP_HEADER, PcapWriter, internet_checksum)
+from simulator import Simulator
+
+
+def read_capture(path):
+    """(ip fields, tcp fields, payload, raw ip packet) for every record"""
+    data = path.read_bytes()
+    magic, major, minor, _, _, _, linktype = PCAP_HEADER.unpack_from(data)
+    assert (magic, major, minor, linktype) == (0xA1B2C3D4, 2, 4, 101)
+    records = []
+    offset = PCAP_HEADER.size
+    while offset < len(data):
+        _, _, captured, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        raw = data[offset:offset + captured]
+        offset += captured
+        assert captured == length
+        ip = IP_HEADER.unpack_from(raw)
+        tcp = TCP_HEADER.unpack_from(raw, IP_HEADER.size)
+        records.append((ip, tcp, raw[IP_HEADER.size + TCP_HEADER.size:], raw))
+    return records
+
+
+def tcp_checksum_ok(ip, raw):
+    src, dst = ip[8], ip[9]
+    segment = raw[IP_HEADER.size:]
+    return internet_checksum(PSEUDO_HEADER.pack(src, dst, 0, 6, len(segment)) + segment) == 0
+
+
+def test_internet_checksum_matches_rfc_1071_example():
+    # RFC 1071 section 3 sums 00 01 f2 03 f4 f5 f6 f7 to 0xddf2
+    assert internet_checksum(bytes.fromhex("0001f203f4f5f6f7")) == ~0xDDF2 & 0xFFFF
+    assert internet_checksum(b"\x01") == ~0x0100 & 0xFFFF  # Odd length pads with zero
+
+
+def test_simulated_run_has_valid_checksums(tmp_path):
+    path = tmp_path / "run.pcap"
+    sim = Simulator(seed=4, error_rate=0.2, loss_rate=0.05)
+    capture = PcapWriter(str(path), buffer_size=512)
+    sim.add_listener(capture)
+    for i in range(5):
+        sim.add_connection(20, 4, start_time=i * 0.01)
+    sim.run()
+    capture.close()
+
+    records = read_capture(path)
+    assert len(records) == capture.packets == sim.stats["packets_sent"]
+    for ip, _, _, raw in records:
+        assert ip[2] == len(raw)
+        assert internet_checksum(raw[:IP_HEADER.size]) == 0
+    # Only the packets the simulator corrupted carry a bad TCP checksum
+    bad = sum(not tcp_checksum_ok(ip, raw) for ip, _, _, raw in records)
+    assert bad == sim.stats["corrupt_packets"] > 0
+
+
+def test_sequence_numbers_follow_payload_bytes_and_fins(tmp_path):
+    path = tmp_path / "seq.pcap"
+    capture = PcapWriter(str(path))
+    c2s, s2c = "client_to_server", "server_to_client"
+    packets = [
+        (c2s, Packet(SYN)),
+        (s2c, Packet(SYN_ACK)),
+        (c2s, Packet(ACK)),
+        (s2c, Packet(DATA, 1, "first")),
+        (s2c, Packet(DATA, 2, "second!")),
+        (s2c, Packet(DATA, 2, "second! (resend)")),
+        (c2s, Packet(ACK, 2)),
+        (c2s, Packet(FIN)),
+        (s2c, Packet(FIN_ACK)),
+        (c2s, Packet(ACK)),
+        (s2c, Packet(FIN_ACK)),  # Final ACK lost: FIN+ACK and ACK repeated
+        (c2s, Packet(ACK)),
+    ]
+    for t, (direction, packet) in enumerate(packets):
+        capture.write_packet(t * 0.01, 0, direction, packet)
+    capture.close()
+
+    (syn, synack, _, data1, data2, resend, ack, fin, finack, last, finack2, last2) = [
+        (tcp[2], tcp[3], payload) for _, tcp, payload, _ in read_capture(path)]
+    server = synack[0] + 1
+    client = syn[0] + 1
+    assert data1 == (server, client, b"first")
+    assert data2 == (server + 5, client, b"second!")
+    assert resend[:2] == data2[:2] and len(resend[2]) == len(data2[2])
+    assert ack[:2] == (client, server + 12)
+    assert fin[:2] == (client, server + 12)
+    assert finack[:2] == (server + 12, client + 1)  # The client's FIN took a sequence number
+    assert last[:2] == (client + 1, server + 13)
+    assert (finack2[:2], last2[:2]) == (finack[:2], last[:2])
+    assert not (capture._server_next or capture._fins or capture._segments)
+
+
+def test_state_is_dropped_after_each_final_ack(tmp_path):
+    capture = PcapWriter(str(tmp_path / "many.pcap"))
+    sim = Simulator(seed=4, error_rate=0.1)
+    for i in range(200):
+        sim.add_connection(6, 3, start_time=i * 0.01)
+    sim.add_listener(capture)
+    sim.run()
+    capture.close()
+    assert sim.stats["connections_completed"] == 200
+    assert not (capture._server_next or capture._fins or capture._segments)
+    assert len(capture._closed) <= 200
+
+
+def test_resent_memoryview_segment_is_padded(tmp_path):
+    path = tmp_path / "view.pcap"
+    capture = PcapWriter(str(path))
+    data = memoryview(b"0123456789")
+    capture.write_packet(0.0, 0, "server_to_client", Packet(DATA, 1, data[:6]))
+    capture.write_packet(0.1, 0, "server_to_client", Packet(DATA, 1, data[:4]))
+    capture.close()
+    first, resend = [payload for _, _, payload, _ in read_capture(path)]
+    assert first == b"012345" and resend == b"0123\0\0"
+
+
+def test_oversized_mss_is_rejected(tmp_path):
+    PcapWriter(str(tmp_path / "ok.pcap"), mss=MAX_PAYLOAD).close()
+    with pytest.raises(ValueError, match="MSS"):
+        PcapWriter(str(tmp_path / "big.pcap"), mss=MAX_PAYLOAD + 1)
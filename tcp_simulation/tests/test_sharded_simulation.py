@@ -0,0 +1,46 @@
+# test_sharded_simulation.py
+# Sharded runs against single-process runs of the same shards
+
+import pytest
+
+from sharded_simulation import run_sharded
+from simulator import Simulator, CONNECTION_STATES
+
+OPTIONS = dict(num_packets=12, window_size=4, error_rate=0.2, loss_rate=0.05, link_delay=0.05)
+
+
+def single_process_totals(seed, connections):
+    """Counters of one Simulator run in this process, as a worker would publish them"""
+    sim = Simulator(seed=seed, link_delay=OPTIONS["link_delay"],
+                    error_rate=OPTIONS["error_rate"], loss_rate=OPTIONS["loss_rate"])
+    for i in range(connections):
+        sim.add_connection(OPTIONS["num_packets"], OPTIONS["window_size"],
+                           start_time=i * OPTIONS["link_delay"] / 10)
+    sim.run()
+    totals = dict(sim.stats)
+    totals.update((f"state_{state}", count) for state, count in sim.state_counts().items())
+    return totals
+
+
+def test_shared_memory_totals_match_single_process_runs():
+    # 24 connections on 2 workers: 12 each, worker n seeded with seed + n
+    result = run_sharded(24, workers=2, seed=7, publish_interval=0.5, **OPTIONS)
+    first, second = single_process_totals(7, 12), single_process_totals(8, 12)
+    expected = {field: first[field] + second[field] for field in first}
+
+    assert result["workers"] == 2
+    assert result["done"] == 2
+    assert {field: result[field] for field in expected} == expected
+    assert expected["connections_completed"] > 0
+
+
+def test_uneven_split_runs_every_connection():
+    result = run_sharded(25, workers=3, seed=1, **OPTIONS)
+    states = sum(result[f"state_{state}"] for state in CONNECTION_STATES)
+    assert states == 25
+    assert result["connections_completed"] + result["connections_failed"] == 25
+
+
+def test_failed_shard_raises():
+    with pytest.raises(RuntimeError, match="2 of 2 shards failed"):
+        run_sharded(10, workers=2, window_size=None, poll_interval=0.01)
@@ -0,0 +1,62 @@
+# test_simulator.py
+# Headless simulator: flow control and acknowledgement schemes
+
+from simulator import Simulator
+
+
+def completion_time(read_rate, ack_mode="nack", seed=1, error_rate=0.0, packets=200, window=20):
+    sim = Simulator(seed=seed, error_rate=error_rate, read_rate=read_rate, ack_mode=ack_mode)
+    conn = sim.add_connection(packets, window)
+    sim.run()
+    assert sim.stats["connections_completed"] == 1
+    return conn.completion_time - conn.start_time, sim
+
+
+def test_fast_reader_matches_unlimited_reader():
+    # A reader 100x faster than the RTT must not be slowed down by flow control
+    unlimited, _ = completion_time(None)
+    fast, sim = completion_time(10000)
+    assert fast <= unlimited * 1.05
+    assert sim.stats["zero_window_events"] == 0
+
+
+def test_slow_reader_window_updates_are_not_silly():
+    # Window updates reopen at least half the buffer, never a single packet
+    sim = Simulator(seed=1, error_rate=0.0, read_rate=50)
+    sim.add_connection(100, 20)
+    windows = []
+    sim.add_listener(lambda event, conn_id, direction, packet, sent_at, at:
+                     event == "send" and str(packet.data).startswith("RWND:")
+                     and windows.append(int(packet.data.split(":")[1].split(";")[0])))
+    sim.run()
+    assert sim.stats["connections_completed"] == 1
+    assert windows and all(w == 0 or w >= 10 for w in windows)
+
+
+def run_mode(ack_mode, loss_rate=0.0, seed=0):
+    sim = Simulator(seed=seed, error_rate=0.1, loss_rate=loss_rate, ack_mode=ack_mode)
+    for i in range(30):
+        sim.add_connection(100, 8, start_time=i * 0.005)
+    sim.run()
+    durations = [c.completion_time - c.start_time for c in sim.connections if c.completion_time is not None]
+    return sim.stats, sum(durations) / len(durations)
+
+
+def test_sack_defaults_cut_control_traffic_without_slowing_down():
+    for loss_rate in (0.0, 0.05):
+        nack_stats, nack_time = run_mode("nack", loss_rate)
+        sack_stats, sack_time = run_mode("sack", loss_rate)
+        assert sack_stats["connections_completed"] == nack_stats["connections_completed"] == 30
+        assert sack_stats["control_packets"] < 0.95 * nack_stats["control_packets"]
+        assert sack_time <= nack_time
+
+
+def test_sack_reports_a_corrupt_burst_in_one_ack():
+    sim = Simulator(seed=3, error_rate=0.3, ack_mode="sack")
+    sim.add_connection(8, 8)
+    acks = []
+    sim.add_listener(lambda event, conn_id, direction, packet, sent_at, at:
+                     event == "send" and "BAD:" in str(packet.data) and acks.append((at, packet.data)))
+    sim.run()
+    bad_times = [at for at, _ in acks]
+    assert acks and len(bad_times) == len(set(bad_times))  # One report per arrival instant
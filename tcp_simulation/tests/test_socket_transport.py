@@ -0,0 +1,15 @@
+# test_socket_transport.py
+# Loopback transfers over the batched UDP transport
+
+from socket_transport import run_loopback_transfer
+
+
+def test_small_payloads_repair_corruption_through_nacks():
+    # NACKs list many sequence numbers; a tiny data payload must not truncate
+    # them, or corrupt packets are only recovered by whole-window timeouts
+    result = run_loopback_transfer(3000, 256, payload_size=16, error_rate=0.3, seed=1)
+    assert result["bytes_delivered"] == 3000 * 16
+    assert result["corrupt"] > 0
+    # A loaded machine may add a timeout-driven resend, but NACKs repair the
+    # rest: window-wide timeout resends would multiply the count instead
+    assert result["corrupt"] <= result["retransmissions"] < 2 * result["corrupt"]
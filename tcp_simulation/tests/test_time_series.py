@@ -0,0 +1,72 @@
+# test_time_series.py
+# RingSeries buckets and min/max downsampling for the live charts
+
+import random
+
+import pytest
+
+from time_series import COUNTER, GAUGE, RingSeries
+
+
+def test_gauge_downsampling_keeps_every_extreme():
+    rng = random.Random(3)
+    series = RingSeries(capacity=1000, resolution=1.0, kind=GAUGE)
+    samples = []
+    for i in range(5000):
+        t = i * 0.1
+        value = rng.uniform(-100, 100)
+        series.record(t, value)
+        samples.append((t, value))
+
+    points = series.downsample(50)
+    assert len(points) == 50
+    for column, (start, low, high) in enumerate(points):
+        assert start == column * 10.0
+        values = [v for t, v in samples if start <= t < start + 10.0]
+        assert (low, high) == (min(values), max(values))
+
+
+def test_downsampling_without_merging_returns_buckets():
+    series = RingSeries(capacity=8, resolution=0.5)
+    for t, value in [(0.1, 3), (0.2, 1), (0.4, 2), (1.2, 7)]:
+        series.record(t, value)
+    assert series.downsample(100) == [(0.0, 1, 3), (1.0, 7, 7)]
+    assert series.downsample(0) == [] and RingSeries().downsample(10) == []
+
+
+def test_ring_overwrites_the_oldest_buckets():
+    series = RingSeries(capacity=4, resolution=1.0)
+    for t in range(10):
+        series.record(t + 0.5, t)
+    assert series.count == 4
+    assert (series.start_time, series.end_time) == (6.0, 10.0)
+    assert [low for _, low, _ in series.downsample(4)] == [6, 7, 8, 9]
+    assert series.last() == 9
+
+
+def test_counter_rates_and_zero_buckets():
+    series = RingSeries(capacity=16, resolution=0.5, kind=COUNTER)
+    series.add(0.1)
+    series.add(0.2, 2)
+    series.add(2.1)  # Nothing happened in the three buckets before this one
+    assert series.count == 5
+    assert series.downsample(16) == [(0.0, 6.0, 6.0), (0.5, 0.0, 0.0), (1.0, 0.0, 0.0),
+                                     (1.5, 0.0, 0.0), (2.0, 2.0, 2.0)]
+    # A column spanning active and idle buckets shows the idle minimum
+    assert series.downsample(2) == [(0.0, 0.0, 6.0), (1.5, 0.0, 2.0)]
+    assert series.last() == pytest.approx(2.0)
+
+
+def test_counter_gap_longer_than_the_ring():
+    series = RingSeries(capacity=4, resolution=1.0, kind=COUNTER)
+    series.add(0.5)
+    series.add(100.5, 3)
+    assert series.count == 4
+    assert series.downsample(4) == [(97.0, 0.0, 0.0), (98.0, 0.0, 0.0), (99.0, 0.0, 0.0), (100.0, 3.0, 3.0)]
+
+
+def test_clear():
+    series = RingSeries(capacity=4)
+    series.record(1.0, 5)
+    series.clear()
+    assert series.count == 0 and series.last() is None and series.start_time is None
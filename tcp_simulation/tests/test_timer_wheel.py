@@ -0,0 +1,72 @@
+# test_timer_wheel.py
+# TimerWheel checked against a plain heap of (expires, id) pairs
+
+import heapq
+import random
+
+from timer_wheel import TimerWheel
+
+
+def test_expiry_matches_heap_reference():
+    # A small wheel (4 slots, 2 levels) so cascades and the overflow list run often
+    rng = random.Random(7)
+    wheel = TimerWheel(tick=0.01, slot_bits=2, levels=2)
+    heap = []
+    timers = {}
+    cancelled = set()
+    now = 0.0
+    for step in range(3000):
+        action = rng.random()
+        if action < 0.5:
+            expires = now + rng.choice((0.0, rng.uniform(0, 0.05), rng.uniform(0, 0.5), rng.uniform(0, 5)))
+            timers[step] = wheel.schedule_at(expires, None, step)
+            heapq.heappush(heap, (expires, step))
+        elif action < 0.65 and timers:
+            victim = rng.choice(list(timers))
+            wheel.cancel(timers.pop(victim))
+            cancelled.add(victim)
+        else:
+            now += rng.choice((0.003, 0.01, rng.uniform(0, 0.3), rng.uniform(0, 3)))
+            fired = [timer.args[0] for timer in wheel.expired(now)]
+            expected = []
+            while heap and heap[0][0] <= now:
+                _, key = heapq.heappop(heap)
+                if key not in cancelled:
+                    expected.append(key)
+            assert sorted(fired) == sorted(expected)
+            for key in fired:
+                del timers[key]
+
+        pending = [(e, k) for e, k in heap if k not in cancelled]
+        assert len(wheel) == len(pending) == len(timers)
+        assert wheel.next_expiry() == (min(pending)[0] if pending else None)
+
+
+def test_expired_returns_timers_in_expiry_order():
+    wheel = TimerWheel(tick=0.01)
+    for expires in (0.5, 0.02, 0.3, 0.021, 0.0):
+        wheel.schedule_at(expires, None)
+    assert [timer.expires for timer in wheel.expired(1.0)] == [0.0, 0.02, 0.021, 0.3, 0.5]
+
+
+def test_timer_never_fires_before_its_deadline():
+    wheel = TimerWheel(tick=0.01)
+    timer = wheel.schedule_at(0.015, None)
+    assert wheel.expired(0.01) == []
+    assert wheel.expired(0.0149) == []
+    assert wheel.expired(0.015) == [timer]
+
+
+def test_cancel_is_idempotent_and_fire_skips_cancelled():
+    wheel = TimerWheel(tick=0.01)
+    fired = []
+    keep = wheel.schedule(0.1, fired.append, "keep")
+    drop = wheel.schedule(0.1, fired.append, "drop")
+    wheel.cancel(drop)
+    wheel.cancel(drop)
+    wheel.cancel(None)
+    assert not drop.pending and keep.pending
+    assert wheel.fire(1.0) == 1
+    assert fired == ["keep"]
+    wheel.cancel(keep)  # Already fired
+    assert len(wheel) == 0 and wheel.next_expiry() is None
@@ -0,0 +1,99 @@
+# test_topology.py
+# Shortest-path routes, the next-hop cache, router queues and topology specs
+
+import pytest
+
+from simulator import Simulator
+from topology import Link, Topology, chain, dumbbell, mesh, parse_topology
+
+
+def diamond():
+    """c - a - s with a slow detour c - b - s; hosts at both ends"""
+    topo = Topology("diamond")
+    topo.add_host("c", "client")
+    topo.add_host("s", "server")
+    for router in ("a", "b"):
+        topo.add_node(router)
+    topo.connect("c", "a", 0.01)
+    topo.connect("a", "s", 0.05)
+    topo.connect("c", "b", 0.02)
+    topo.connect("b", "s", 0.02)
+    return topo
+
+
+def test_routes_take_the_lowest_delay_path():
+    topo = diamond()
+    assert topo.shortest_path("c", "s") == ["c", "b", "s"]
+    assert topo.route("c", "s") == ["c", "b", "s"]
+    assert topo.route("s", "c") == ["s", "b", "c"]
+    assert chain(4).route("c0", "s0") == ["c0", "r0", "r1", "r2", "r3", "s0"]
+    route = mesh(3, 3).route("c1", "s1")
+    assert (route[1], route[-2], len(route)) == ("r0_0", "r2_2", 7)  # 4 router hops across the grid
+
+
+def test_hosts_do_not_forward():
+    topo = Topology("hosts")
+    for host in ("c", "h", "s"):
+        topo.add_host(host, "client")
+    topo.add_node("r")
+    topo.connect("c", "h", 0.01)
+    topo.connect("h", "s", 0.01)
+    topo.connect("c", "r", 0.1)
+    topo.connect("r", "s", 0.1)
+    assert topo.route("c", "s") == ["c", "r", "s"]
+
+    topo.add_host("x", "server")
+    with pytest.raises(ValueError, match="No route"):
+        topo.route("c", "x")
+
+
+def test_one_search_caches_every_hop_and_connect_invalidates():
+    topo = diamond()
+    searches = []
+    shortest_path = topo.shortest_path
+    topo.shortest_path = lambda src, dst: searches.append((src, dst)) or shortest_path(src, dst)
+
+    topo.route("c", "s")
+    topo.route("b", "s")
+    assert searches == [("c", "s")]
+    assert topo.next_link("c", "s") is topo.links["c"]["b"]
+
+    # A faster link appears: cached next hops must not outlive it
+    topo.connect("a", "s", 0.001)
+    assert topo.route("c", "s") == ["c", "a", "s"]
+    assert searches == [("c", "s"), ("c", "s")]
+
+
+def test_link_queues_and_tail_drop():
+    link = Link("a", "b", delay=0.1, rate=10.0, queue_limit=2)
+    assert link.enqueue(0.0) == pytest.approx(0.2)
+    assert link.enqueue(0.0) == pytest.approx(0.3)
+    assert link.enqueue(0.0) is None
+    assert link.enqueue(0.1) == pytest.approx(0.4)  # The first packet has left
+    assert (link.forwarded, link.dropped, link.max_queue) == (3, 1, 2)
+
+
+def test_simulated_connections_follow_the_topology():
+    topo = dumbbell(2, bottleneck_rate=500.0)
+    sim = Simulator(seed=1, error_rate=0.0, topology=topo)
+    for _ in range(4):
+        sim.add_connection(20, 4)
+    sim.run()
+    assert sim.stats["connections_completed"] == 4
+    forwarded = {(src, dst): count for src, dst, count, _, _ in topo.link_stats()}
+    assert forwarded[("ra", "rb")] > 0 and forwarded[("rb", "ra")] >= 4 * 20
+
+
+@pytest.mark.parametrize("spec", ["ring:3", "mesh:ax2", "chain:0", "dumbbell:-1", "chain:x"])
+def test_malformed_specs_are_rejected(spec):
+    with pytest.raises(ValueError, match="Bad topology"):
+        parse_topology(spec)
+
+
+def test_spec_options_reach_every_link():
+    topo = parse_topology("dumbbell:3", delay=0.2, rate=50.0, queue_limit=5)
+    links = [link for node in topo.links.values() for link in node.values()]
+    assert len(topo.clients) == len(topo.servers) == 3
+    assert all(link.delay == 0.2 and link.queue_limit == 5 for link in links)
+    assert topo.links["ra"]["rb"].rate == 50.0
+    assert parse_topology("mesh:2").name == "mesh:2x2"
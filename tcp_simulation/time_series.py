@@ -0,0 +1,153 @@
+# time_series.py
+# Fixed-size ring buffers of min/max buckets for the live charts
+
+from array import array
+
+GAUGE = "gauge"      # Sampled value (in-flight packets, window size)
+COUNTER = "counter"  # Events added up per bucket and plotted as a rate
+
+
+class RingSeries:
+    def __init__(self, capacity=4096, resolution=1.0, kind=GAUGE):
+        """Time series held in at most `capacity` buckets of `resolution` seconds.
+
+        A gauge bucket keeps the min and max of the values recorded in it; a
+        counter bucket keeps the total added. Any number of samples can land in
+        one bucket, and once the ring is full the oldest bucket is overwritten,
+        so memory and plotting cost stay fixed however long the run is.
+        """
+        self.capacity = capacity
+        self.resolution = resolution
+        self.kind = kind
+        self.buckets = array("q", bytes(8 * capacity))
+        self.low = array("d", bytes(8 * capacity))
+        self.high = array("d", bytes(8 * capacity))
+        self.count = 0
+        self.head = -1  # Slot of the newest bucket
+
+    def clear(self):
+        self.count = 0
+        self.head = -1
+
+    def _slot(self, t):
+        """Slot for time t, opening a new bucket if needed; returns (slot, is_new)"""
+        bucket = int(t // self.resolution)
+        if self.count:
+            newest = self.buckets[self.head]
+            if bucket <= newest:
+                return self.head, False  # Same bucket (late samples fold into the newest)
+            if self.kind == COUNTER:
+                # Buckets with no events are zero, not missing; only the last
+                # capacity - 1 of them can still be in the ring
+                for empty in range(max(newest + 1, bucket - self.capacity + 1), bucket):
+                    self._open(empty)
+                    self.high[self.head] = 0.0
+        self._open(bucket)
+        return self.head, True
+
+    def _open(self, bucket):
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.buckets[self.head] = bucket
+
+    def record(self, t, value):
+        """Gauge: sample value at time t"""
+        slot, is_new = self._slot(t)
+        if is_new:
+            self.low[slot] = self.high[slot] = value
+        elif value < self.low[slot]:
+            self.low[slot] = value
+        elif value > self.high[slot]:
+            self.high[slot] = value
+
+    def add(self, t, amount=1.0):
+        """Counter: add amount at time t"""
+        slot, is_new = self._slot(t)
+        if is_new:
+            self.high[slot] = amount
+        else:
+            self.high[slot] += amount
+
+    @property
+    def start_time(self):
+        if not self.count:
+            return None
+        return self.buckets[(self.head - self.count + 1) % self.capacity] * self.resolution
+
+    @property
+    def end_time(self):
+        if not self.count:
+            return None
+        return (self.buckets[self.head] + 1) * self.resolution
+
+    def last(self):
+        """Most recent value (rate for counters), or None when empty"""
+        if not self.count:
+            return None
+        if self.kind == COUNTER:
+            return self.high[self.head] / self.resolution
+        return self.high[self.head]
+
+    def downsample(self, columns):
+        """Merge the buckets into at most `columns` (time, min, max) points.
+
+        Counter values are rates; a column that spans buckets with no events
+        has a minimum of zero.
+        """
+        if not self.count or columns <= 0:
+            return []
+        oldest = (self.head - self.count + 1) % self.capacity
+        first = self.buckets[oldest]
+        span = self.buckets[self.head] - first + 1
+        per_column = -(-span // columns)
+        counter = self.kind == COUNTER
+
+        points = []
+        column = -1
+        low = high = 0.0
+        filled = 0
+        for i in range(self.count):
+            slot = (oldest + i) % self.capacity
+            c = (self.buckets[slot] - first) // per_column
+            if counter:
+                value_low = value_high = self.high[slot] / self.resolution
+            else:
+                value_low, value_high = self.low[slot], self.high[slot]
+            if c != column:
+                if column >= 0:
+                    points.append(self._point(first, column, per_column, span, low, high, filled))
+                column, low, high, filled = c, value_low, value_high, 0
+            else:
+                low = min(low, value_low)
+                high = max(high, value_high)
+            filled += 1
+        points.append(self._point(first, column, per_column, span, low, high, filled))
+        return points
+
+    def _point(self, first, column, per_column, span, low, high, filled):
+        column_span = min(per_column, span - column * per_column)
+        if self.kind == COUNTER and filled < column_span:
+            low = 0.0
+        return ((first + column * per_column) * self.resolution, low, high)
+
+
+class RunMetrics:
+    def __init__(self, capacity=4096, resolution=1.0):
+        """The series charted for a GUI run, indexed by simulated time"""
+        self.goodput = RingSeries(capacity, resolution, COUNTER)
+        self.in_flight = RingSeries(capacity, resolution, GAUGE)
+        self.retransmissions = RingSeries(capacity, resolution, COUNTER)
+        self.window = RingSeries(capacity, resolution, GAUGE)
+
+    def charts(self):
+        """(title, series) pairs in display order"""
+        return (
+            ("Goodput (pkt/s)", self.goodput),
+            ("In flight (pkts)", self.in_flight),
+            ("Retransmissions (pkt/s)", self.retransmissions),
+            ("Window size (pkts)", self.window)
+        )
+
+    def clear(self):
+        for _, series in self.charts():
+            series.clear()
@@ -0,0 +1,207 @@
+# timer_wheel.py
+# Hierarchical timer wheel: O(1) schedule/cancel for protocol timeouts
+
+import threading
+
+
+class Timer:
+    __slots__ = ("expires", "callback", "args", "cancelled", "_slot")
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._slot = None
+
+    @property
+    def pending(self):
+        """True while the timer sits in the wheel waiting to expire"""
+        return self._slot is not None and not self.cancelled
+
+
+class TimerWheel:
+    def __init__(self, tick=0.01, slot_bits=8, levels=4, start=0.0, thread_safe=False):
+        """Timers are kept at tick resolution on levels of 2**slot_bits slots each.
+
+        Level 0 covers the next 2**slot_bits ticks, each higher level covers
+        2**slot_bits times more; anything further out waits in an overflow
+        list. Higher-level slots are cascaded down as the wheel turns.
+        """
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.slots = 1 << slot_bits
+        self.mask = self.slots - 1
+        self.levels = levels
+        self.now = start
+        self._current = int(start / tick)
+        self._wheels = [[{} for _ in range(self.slots)] for _ in range(levels)]
+        self._overflow = {}
+        self._count = 0
+        self._lock = threading.RLock() if thread_safe else None
+
+    def __len__(self):
+        return self._count
+
+    def _tick_of(self, when):
+        # Round up so a timer never fires before its deadline
+        ticks = when / self.tick
+        whole = int(ticks)
+        return whole if whole == ticks else whole + 1
+
+    def _place(self, timer):
+        expire_tick = self._tick_of(timer.expires)
+        delta = expire_tick - self._current
+        if delta <= 0:
+            slot = self._wheels[0][self._current & self.mask]
+        else:
+            slot = None
+            for level in range(self.levels):
+                if delta < 1 << (self.slot_bits * (level + 1)):
+                    index = (expire_tick >> (self.slot_bits * level)) & self.mask
+                    slot = self._wheels[level][index]
+                    break
+            if slot is None:
+                slot = self._overflow
+        slot[timer] = None
+        timer._slot = slot
+
+    def schedule_at(self, expires, callback, *args):
+        """Schedule callback(*args) at absolute time expires; returns the Timer"""
+        timer = Timer(expires, callback, args)
+        if self._lock:
+            with self._lock:
+                self._place(timer)
+                self._count += 1
+        else:
+            self._place(timer)
+            self._count += 1
+        return timer
+
+    def schedule(self, delay, callback, *args):
+        """Schedule callback(*args) delay seconds after the wheel's current time"""
+        return self.schedule_at(self.now + delay, callback, *args)
+
+    def cancel(self, timer):
+        """Cancel a timer in O(1); safe to call on fired or cancelled timers"""
+        if timer is None or timer.cancelled:
+            return
+        if self._lock:
+            with self._lock:
+                self._remove(timer)
+        else:
+            self._remove(timer)
+
+    def _remove(self, timer):
+        timer.cancelled = True
+        slot = timer._slot
+        if slot is not None:
+            del slot[timer]
+            timer._slot = None
+            self._count -= 1
+
+    def _cascade(self, level, index):
+        """Move a higher-level slot's timers down to their proper level"""
+        slot = self._wheels[level][index]
+        if not slot:
+            return
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def _turn(self):
+        """Advance one tick, cascading higher levels when lower ones wrap"""
+        self._current += 1
+        current = self._current
+        for level in range(1, self.levels):
+            if (current >> (self.slot_bits * (level - 1))) & self.mask:
+                break
+            self._cascade(level, (current >> (self.slot_bits * level)) & self.mask)
+        else:
+            if self._overflow and not current & ((1 << (self.slot_bits * self.levels)) - 1):
+                timers = list(self._overflow)
+                self._overflow.clear()
+                for timer in timers:
+                    self._place(timer)
+
+    def expired(self, now, first_batch_only=False):
+        """Remove and return timers due by now, in expiry order.
+
+        With first_batch_only the wheel stops after the first tick that has
+        anything due, so a caller can interleave other events between batches.
+        """
+        if self._lock:
+            with self._lock:
+                return self._expired(now, first_batch_only)
+        return self._expired(now, first_batch_only)
+
+    def _expired(self, now, first_batch_only):
+        target = self._tick_of(now)
+        batch = []
+        if self._count == 0:
+            # Nothing pending: jump straight to the target tick
+            if target > self._current:
+                self._current = target
+            self.now = max(self.now, now)
+            return batch
+
+        while True:
+            slot = self._wheels[0][self._current & self.mask]
+            if slot:
+                due = [t for t in slot if t.expires <= now]
+                for timer in due:
+                    del slot[timer]
+                    timer._slot = None
+                self._count -= len(due)
+                batch.extend(due)
+                if due and first_batch_only:
+                    break
+            if self._current >= target or self._count == 0:
+                break
+            self._turn()
+
+        if self._count == 0 and target > self._current:
+            self._current = target
+        batch.sort(key=lambda t: t.expires)
+        self.now = max(self.now, now if not (first_batch_only and batch) else batch[-1].expires)
+        return batch
+
+    def fire(self, now):
+        """Run every timer due by now in one batch; returns how many ran"""
+        fired = 0
+        for timer in self.expired(now):
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+    def next_expiry(self):
+        """Earliest pending expiry time, or None if the wheel is empty"""
+        if self._lock:
+            with self._lock:
+                return self._next_expiry()
+        return self._next_expiry()
+
+    def _next_expiry(self):
+        if self._count == 0:
+            return None
+        best = None
+        for level in range(self.levels):
+            start = (self._current >> (self.slot_bits * level)) & self.mask
+            wheel = self._wheels[level]
+            # Level 0's current slot holds overdue timers; on higher levels the
+            # current slot belongs to the next rotation, so it is checked last
+            first = 0 if level == 0 else 1
+            for offset in range(first, first + self.slots):
+                slot = wheel[(start + offset) & self.mask]
+                if slot:
+                    earliest = min(t.expires for t in slot)
+                    if best is None or earliest < best:
+                        best = earliest
+                    break
+        if self._overflow:
+            earliest = min(t.expires for t in self._overflow)
+            if best is None or earliest < best:
+                best = earliest
+        return best
@@ -0,0 +1,203 @@
+# topology.py
+# Multi-hop networks for the headless simulator: hosts, routers with output
+# queues, and shortest-path routes cached per (node, destination)
+
+import heapq
+from collections import deque
+
+HOST = "host"
+ROUTER = "router"
+
+
+class Link:
+    def __init__(self, src, dst, delay, rate=None, queue_limit=64):
+        """One direction of a link: an output queue at src drained at `rate`
+        packets/s (None: no serialisation, never queues), then `delay` seconds
+        of propagation to dst"""
+        self.src = src
+        self.dst = dst
+        self.delay = delay
+        self.rate = rate
+        self.queue_limit = queue_limit
+        self.departures = deque()  # Departure times of the packets queued here
+        self.forwarded = 0
+        self.dropped = 0
+        self.max_queue = 0
+
+    def enqueue(self, now):
+        """Queue a packet at time now; returns when it reaches dst, or None
+        when the queue is full (tail drop)"""
+        if self.rate is None:
+            self.forwarded += 1
+            return now + self.delay
+        departures = self.departures
+        while departures and departures[0] <= now:
+            departures.popleft()
+        if len(departures) >= self.queue_limit:
+            self.dropped += 1
+            return None
+        start = departures[-1] if departures else now
+        done = start + 1.0 / self.rate
+        departures.append(done)
+        self.forwarded += 1
+        self.max_queue = max(self.max_queue, len(departures))
+        return done + self.delay
+
+
+class Topology:
+    def __init__(self, name="custom"):
+        self.name = name
+        self.kinds = {}   # Node name -> HOST or ROUTER
+        self.links = {}   # Node name -> {neighbour: Link}
+        self.clients = []
+        self.servers = []
+        self._next_link = {}  # (node, destination) -> Link, filled on first use
+
+    def add_node(self, name, kind=ROUTER):
+        self.kinds[name] = kind
+        self.links.setdefault(name, {})
+
+    def add_host(self, name, role):
+        """Add a host; role "client" or "server" makes it a connection endpoint"""
+        self.add_node(name, HOST)
+        (self.clients if role == "client" else self.servers).append(name)
+
+    def connect(self, a, b, delay, rate=None, queue_limit=64):
+        """Add a full-duplex link (one queue per direction)"""
+        self.links[a][b] = Link(a, b, delay, rate, queue_limit)
+        self.links[b][a] = Link(b, a, delay, rate, queue_limit)
+        self._next_link.clear()
+
+    def shortest_path(self, src, dst):
+        """Lowest-delay path from src to dst (Dijkstra; ties broken by name).
+        Hosts only originate or terminate traffic, they never forward it."""
+        dist = {src: 0.0}
+        previous = {}
+        heap = [(0.0, src)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == dst:
+                break
+            if d > dist[node] or (node != src and self.kinds[node] == HOST):
+                continue
+            for neighbour, link in self.links[node].items():
+                nd = d + link.delay
+                if nd < dist.get(neighbour, float("inf")):
+                    dist[neighbour] = nd
+                    previous[neighbour] = node
+                    heapq.heappush(heap, (nd, neighbour))
+        if dst not in dist:
+            raise ValueError(f"No route from {src} to {dst} in topology {self.name}")
+        path = [dst]
+        while path[-1] != src:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path
+
+    def next_link(self, node, dst):
+        """Outgoing link from node towards dst; a dict lookup once cached"""
+        link = self._next_link.get((node, dst))
+        if link is None:
+            # Every suffix of a shortest path is itself a shortest path, so one
+            # search fills the table for each node along the route
+            path = self.shortest_path(node, dst)
+            for here, there in zip(path, path[1:]):
+                self._next_link.setdefault((here, dst), self.links[here][there])
+            link = self._next_link[(node, dst)]
+        return link
+
+    def route(self, src, dst):
+        """Node names a packet visits from src to dst"""
+        path = [src]
+        while path[-1] != dst:
+            path.append(self.next_link(path[-1], dst).dst)
+        return path
+
+    def link_stats(self):
+        """(src, dst, forwarded, dropped, max_queue) for every queued link that carried traffic"""
+        return [
+            (link.src, link.dst, link.forwarded, link.dropped, link.max_queue)
+            for node in self.links for link in self.links[node].values()
+            if link.rate is not None and link.forwarded + link.dropped
+        ]
+
+
+def chain(hops=3, delay=0.01, rate=1000.0, queue_limit=64):
+    """client - r0 - r1 - ... - server, `hops` routers in a line"""
+    topo = Topology(f"chain:{hops}")
+    topo.add_host("c0", "client")
+    topo.add_host("s0", "server")
+    routers = [f"r{i}" for i in range(hops)]
+    for router in routers:
+        topo.add_node(router)
+    for a, b in zip(["c0"] + routers, routers + ["s0"]):
+        topo.connect(a, b, delay, rate, queue_limit)
+    return topo
+
+
+def dumbbell(pairs=4, delay=0.01, access_rate=None, bottleneck_rate=200.0,
+             bottleneck_delay=0.03, queue_limit=32):
+    """`pairs` clients behind router ra, `pairs` servers behind rb, and a
+    single ra-rb bottleneck link that every flow shares"""
+    topo = Topology(f"dumbbell:{pairs}")
+    topo.add_node("ra")
+    topo.add_node("rb")
+    topo.connect("ra", "rb", bottleneck_delay, bottleneck_rate, queue_limit)
+    for i in range(pairs):
+        topo.add_host(f"c{i}", "client")
+        topo.add_host(f"s{i}", "server")
+        topo.connect(f"c{i}", "ra", delay, access_rate, queue_limit)
+        topo.connect(f"s{i}", "rb", delay, access_rate, queue_limit)
+    return topo
+
+
+def mesh(rows=3, cols=3, pairs=2, delay=0.01, rate=1000.0, queue_limit=64):
+    """Grid of routers; clients attach to the top-left router, servers to
+    the bottom-right one"""
+    topo = Topology(f"mesh:{rows}x{cols}")
+    for r in range(rows):
+        for c in range(cols):
+            topo.add_node(f"r{r}_{c}")
+    for r in range(rows):
+        for c in range(cols):
+            if c + 1 < cols:
+                topo.connect(f"r{r}_{c}", f"r{r}_{c + 1}", delay, rate, queue_limit)
+            if r + 1 < rows:
+                topo.connect(f"r{r}_{c}", f"r{r + 1}_{c}", delay, rate, queue_limit)
+    for i in range(pairs):
+        topo.add_host(f"c{i}", "client")
+        topo.add_host(f"s{i}", "server")
+        topo.connect(f"c{i}", "r0_0", delay, None, queue_limit)
+        topo.connect(f"s{i}", f"r{rows - 1}_{cols - 1}", delay, None, queue_limit)
+    return topo
+
+
+def parse_topology(spec, delay=None, rate=None, queue_limit=None):
+    """Build a topology from "chain:N", "dumbbell:PAIRS" or "mesh:RxC"; delay
+    applies to every link, rate to the router links (the bottleneck of a
+    dumbbell). Raises ValueError for a malformed spec."""
+    kind, _, arg = spec.partition(":")
+    usage = f"Bad topology {spec!r} (use chain:N, dumbbell:PAIRS or mesh:RxC)"
+    if kind not in ("chain", "dumbbell", "mesh"):
+        raise ValueError(usage)
+    try:
+        if kind == "mesh":
+            rows, _, cols = (arg or "3x3").partition("x")
+            sizes = [int(rows), int(cols or rows)]
+        else:
+            sizes = [int(arg or (3 if kind == "chain" else 4))]
+    except ValueError:
+        raise ValueError(usage) from None
+    if min(sizes) < 1:
+        raise ValueError(f"{usage}: sizes must be at least 1")
+
+    options = {"delay": delay, "queue_limit": queue_limit,
+               "bottleneck_rate" if kind == "dumbbell" else "rate": rate}
+    if kind == "dumbbell":
+        options["bottleneck_delay"] = delay
+    options = {key: value for key, value in options.items() if value is not None}
+    if kind == "chain":
+        return chain(*sizes, **options)
+    if kind == "dumbbell":
+        return dumbbell(*sizes, **options)
+    return mesh(*sizes, **options)